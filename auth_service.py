@@ -5,48 +5,146 @@ Users can optionally create an "Identity" with username/password.
 
 import os
 import hashlib
+import hmac
+import re
 import secrets
-from datetime import datetime, timedelta
+import time
 from typing import Optional
 import jwt
+from cache import TTLCache
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 
-# JWT Configuration
+
+def _load_signing_key() -> Ed25519PrivateKey:
+    """Load the Ed25519 signing key from JWT_PRIVATE_KEY (PEM).
+
+    Without it a throwaway key is generated, so tokens stop verifying on
+    restart and on every other worker; that is refused when several workers
+    are configured and warned about otherwise.
+    """
+    pem = os.getenv("JWT_PRIVATE_KEY")
+    if pem:
+        return serialization.load_pem_private_key(pem.encode(), password=None)
+
+    if int(os.getenv("WEB_CONCURRENCY", 1)) > 1:
+        raise RuntimeError(
+            "JWT_PRIVATE_KEY must be set when WEB_CONCURRENCY > 1, otherwise "
+            "each worker signs tokens with its own key. Generate one with: "
+            "openssl genpkey -algorithm ed25519"
+        )
+    print(
+        "WARNING: JWT_PRIVATE_KEY is not set; using a temporary signing key. "
+        "Tokens issued now become invalid when the server restarts."
+    )
+    return Ed25519PrivateKey.generate()
+
+
+# JWT Configuration. JWT_PRIVATE_KEY is an Ed25519 private key in PEM form
+# (openssl genpkey -algorithm ed25519) and must be set in production.
+JWT_PRIVATE_KEY = _load_signing_key()
+JWT_PUBLIC_KEY = JWT_PRIVATE_KEY.public_key()
+JWT_ALGORITHM = "EdDSA"
+# HS256 tokens issued before the switch keep verifying until they expire
 JWT_SECRET = os.getenv("JWT_SECRET", secrets.token_hex(32))
-JWT_ALGORITHM = "HS256"
+JWT_LEGACY_ALGORITHM = "HS256"
 JWT_EXPIRY_DAYS = 90  # 3 months
 
+# Decoded token payloads keyed by BLAKE2b digest of the raw token
+_token_cache = TTLCache(maxsize=4096, ttl=300)
+
+# Password hashing (scrypt). n=2**15, r=8 costs ~32 MiB and ~50-100 ms per hash
+SCRYPT_N = 2**15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+_SCRYPT_HASH_RE = re.compile(
+    r"scrypt\$(\d+)\$(\d+)\$(\d+)\$((?:[0-9a-f]{2})+)\$((?:[0-9a-f]{2})+)"
+)
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=SCRYPT_MAXMEM,
+        dklen=SCRYPT_DKLEN,
+    )
+
 
 def hash_password(password: str) -> str:
-    """Hash a password using SHA-256 with salt."""
-    salt = secrets.token_hex(16)
-    hashed = hashlib.sha256(f"{salt}{password}".encode()).hexdigest()
-    return f"{salt}:{hashed}"
+    """Hash a password using scrypt with a random salt."""
+    salt = os.urandom(16)
+    derived = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${derived.hex()}"
 
 
 def verify_password(password: str, stored_hash: str) -> bool:
-    """Verify a password against its hash."""
-    try:
-        salt, hashed = stored_hash.split(":")
-        return hashlib.sha256(f"{salt}{password}".encode()).hexdigest() == hashed
-    except ValueError:
+    """Verify a password against its hash (scrypt or legacy salted SHA-256)."""
+    if stored_hash.startswith("scrypt$"):
+        match = _SCRYPT_HASH_RE.fullmatch(stored_hash)
+        if not match:
+            return False
+        n, r, p = int(match[1]), int(match[2]), int(match[3])
+        # hashlib.scrypt rejects n values that are not a power of two > 1
+        if n < 2 or n & (n - 1) or not r or not p:
+            return False
+        computed = _scrypt(password, bytes.fromhex(match[4]), n, r, p)
+        return hmac.compare_digest(computed, bytes.fromhex(match[5]))
+
+    # Legacy format: "salt:sha256(salt + password)"
+    parts = stored_hash.split(":", 1)
+    if len(parts) != 2:
         return False
+    salt, hashed = parts
+    computed = hashlib.sha256(f"{salt}{password}".encode()).hexdigest()
+    # Constant-time compare so response timing does not leak the digest
+    return hmac.compare_digest(computed.encode(), hashed.encode())
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    """Check if a stored hash predates the current KDF parameters."""
+    return not stored_hash.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
 
 
 def create_token(user_id: str, username: str) -> str:
     """Create a JWT token for a user."""
+    now = int(time.time())
     payload = {
         "user_id": user_id,
         "username": username,
-        "exp": datetime.utcnow() + timedelta(days=JWT_EXPIRY_DAYS),
-        "iat": datetime.utcnow(),
+        "exp": now + JWT_EXPIRY_DAYS * 86400,
+        "iat": now,
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return jwt.encode(payload, JWT_PRIVATE_KEY, algorithm=JWT_ALGORITHM)
+
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
 
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token."""
+    key = _token_cache_key(token)
+    cached = _token_cache.get(key)
+    if cached is not None:
+        # Expiry still applies to cached payloads
+        if cached["exp"] > time.time():
+            return cached
+        _token_cache.pop(key)
+        return None
+
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        if jwt.get_unverified_header(token).get("alg") == JWT_LEGACY_ALGORITHM:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_LEGACY_ALGORITHM])
+        else:
+            payload = jwt.decode(token, JWT_PUBLIC_KEY, algorithms=[JWT_ALGORITHM])
+        # Only successful decodes are cached; bad tokens are re-checked every time
+        _token_cache.set(key, payload)
         return payload
     except jwt.ExpiredSignatureError:
         return None
@@ -54,6 +152,11 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 
+def forget_token(token: str) -> None:
+    """Drop a token's cached payload (on logout)."""
+    _token_cache.pop(_token_cache_key(token))
+
+
 def generate_user_id() -> str:
-    """Generate a unique user ID."""
-    return secrets.token_hex(8)
+    """Generate a unique user ID (16 hex chars)."""
+    return os.urandom(8).hex()
@@ -0,0 +1,165 @@
+"""
+Small caches shared by the service modules: in-process TTL/LRU, plus a
+response cache that uses Redis when configured.
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import orjson
+from config import REDIS_URL
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or `default` if missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value."""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[0] if item is not None else default
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_redis = None
+
+
+def get_redis():
+    """Shared asyncio Redis client, or None when REDIS_URL is not configured."""
+    global _redis
+    if _redis is None and REDIS_URL:
+        import redis.asyncio as aioredis
+
+        _redis = aioredis.from_url(REDIS_URL)
+    return _redis
+
+
+class ResponseCache:
+    """Cache of JSON-serializable endpoint responses with a stale window.
+
+    Entries are fresh for their TTL and then kept for `stale_ttl` more seconds
+    so callers can fall back to them when the upstream service fails. Stored
+    in Redis (hash of generated_at / stale_at / orjson-encoded body) when
+    REDIS_URL is set, so all workers share it; otherwise in process.
+    """
+
+    def __init__(self, prefix: str, stale_ttl: float = 3600, maxsize: int = 1024):
+        self.prefix = prefix
+        self.stale_ttl = stale_ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=stale_ttl)
+
+    async def get(self, key: str) -> Optional[tuple[Any, bool]]:
+        """Return (value, is_fresh), or None if nothing usable is cached."""
+        redis = get_redis()
+        if redis is None:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            fresh_until, value = entry
+            return value, fresh_until > time.time()
+
+        entry = await redis.hgetall(f"{self.prefix}:{key}")
+        if not entry:
+            return None
+        return orjson.loads(entry[b"body"]), float(entry[b"stale_at"]) > time.time()
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        redis = get_redis()
+        if redis is None:
+            self._local.set(key, (now + ttl, value), ttl=ttl + self.stale_ttl)
+            return
+
+        redis_key = f"{self.prefix}:{key}"
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                redis_key,
+                mapping={
+                    "generated_at": now,
+                    "stale_at": now + ttl,
+                    "body": orjson.dumps(value),
+                },
+            )
+            pipe.expire(redis_key, int(ttl + self.stale_ttl))
+            await pipe.execute()
+
+
+# Identifies this process as the holder of a lock
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Delete the lock only if we still hold it (it may have expired and been
+# taken by another worker)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# In-process fallback: lock key -> expiry (monotonic). Only touched from the
+# event loop, so no thread lock is needed.
+_local_locks: dict[str, float] = {}
+
+
+async def acquire_lock(key: str, ttl: int) -> bool:
+    """Take a lock that expires after `ttl` seconds. False if already held.
+
+    Uses Redis SET NX EX when REDIS_URL is set so the lock holds across
+    workers, and expires on its own if the holder crashes.
+    """
+    redis = get_redis()
+    if redis is None:
+        now = time.monotonic()
+        if _local_locks.get(key, 0) > now:
+            return False
+        _local_locks[key] = now + ttl
+        return True
+
+    return bool(await redis.set(f"lock:{key}", WORKER_ID, nx=True, ex=ttl))
+
+
+async def release_lock(key: str) -> None:
+    redis = get_redis()
+    if redis is None:
+        _local_locks.pop(key, None)
+        return
+
+    await redis.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", WORKER_ID)
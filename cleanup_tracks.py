@@ -6,7 +6,7 @@ Quick script to delete test tracks from Cloudinary
 import sys
 sys.path.insert(0, '/home/Tejesh/Documents/music-app/backend')
 
-from cloudinary_service import delete_track
+from cloudinary_service import bulk_delete_tracks
 
 # Tracks to delete
 tracks_to_delete = [
@@ -20,9 +20,8 @@ tracks_to_delete = [
 
 print("🗑️  Deleting test tracks from Cloudinary...\n")
 
-for track_id in tracks_to_delete:
-    print(f"Deleting {track_id}...")
-    delete_track(track_id)
-    print()
+print(f"Deleting {len(tracks_to_delete)} track(s)...")
+bulk_delete_tracks(tracks_to_delete)
+print()
 
 print("✅ Cleanup complete!")
@@ -1,9 +1,15 @@
 import hashlib
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterator
 
 import cloudinary
 import cloudinary.api
+import cloudinary.api_client.call_api
 import cloudinary.uploader
+import cloudinary.utils
+from cache import TTLCache
 from config import CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET, CLOUDINARY_CLOUD_NAME
 
 cloudinary.config(
@@ -13,34 +19,110 @@ cloudinary.config(
     secure=True,
 )
 
+# The SDK builds its Admin and Upload API connection pools at import time with
+# urllib3's default of one kept-alive connection per host, so concurrent
+# lookups (library fan-out, parallel uploads) each opened a new TLS connection.
+# Both APIs share one larger keep-alive pool instead.
+HTTP_POOL_SIZE = 32
+_http = cloudinary.utils.get_http_connector(
+    cloudinary.config(), {**cloudinary.CERT_KWARGS, "maxsize": HTTP_POOL_SIZE}
+)
+cloudinary.api_client.call_api._http = _http
+cloudinary.uploader._http = _http
+
+_NON_ALNUM = re.compile(r"[^a-zA-Z0-9_-]")
+_MULTI_UNDERSCORE = re.compile(r"_+")
+
+# Existence lookups (including misses) keyed by track_id; uploads and deletes
+# in this process evict. An uploaded track never changes, so hits live longer;
+# misses expire sooner since another worker may upload the track meanwhile.
+# get_track_metadata is built from these two lookups and needs no cache of its own.
+_MISSING = object()
+TRACK_CACHE_SIZE = 10_000
+TRACK_HIT_TTL = 300
+TRACK_MISS_TTL = 60
+_audio_cache = TTLCache(maxsize=TRACK_CACHE_SIZE, ttl=TRACK_HIT_TTL)
+_thumbnail_cache = TTLCache(maxsize=TRACK_CACHE_SIZE, ttl=TRACK_HIT_TTL)
+
+# Max concurrent per-track Admin API lookups when building the library
+LIBRARY_LOOKUP_WORKERS = 16
+
+
+def _track_key(title: str, artist: str) -> bytes:
+    """Normalized title/artist bytes that track IDs are hashed from."""
+    return f"{title.lower().strip()}_{artist.lower().strip()}".encode()
+
+
+def _track_id_from_key(key: bytes) -> str:
+    return hashlib.blake2b(key, digest_size=8).hexdigest()
+
+
+def _legacy_track_id_from_key(key: bytes) -> str:
+    return hashlib.md5(key).hexdigest()[:16]
+
 
+# IDs are a pure function of title/artist and the same tracks are played
+# over and over, so both are memoized
+@lru_cache(maxsize=4096)
 def generate_track_id(title: str, artist: str) -> str:
-    combined = f"{title.lower().strip()}_{artist.lower().strip()}"
-    return hashlib.md5(combined.encode()).hexdigest()[:16]
+    return _track_id_from_key(_track_key(title, artist))
+
+
+@lru_cache(maxsize=4096)
+def generate_legacy_track_id(title: str, artist: str) -> str:
+    """MD5-based ID used by tracks uploaded before the switch to BLAKE2b."""
+    return _legacy_track_id_from_key(_track_key(title, artist))
 
 
 def sanitize_public_id(text: str) -> str:
-    sanitized = re.sub(r"[^a-zA-Z0-9_-]", "_", text)
-    sanitized = re.sub(r"_+", "_", sanitized)
+    sanitized = _NON_ALNUM.sub("_", text)
+    sanitized = _MULTI_UNDERSCORE.sub("_", sanitized)
     return sanitized[:50].strip("_")
 
 
 def check_audio_exists(track_id: str) -> dict | None:
+    cached = _audio_cache.get(track_id, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
     try:
         result = cloudinary.api.resource(
             f"peerless_music/audio/{track_id}", resource_type="video", context=True
         )
-        return {
+        audio = {
             "audio_url": result.get("secure_url"),
             "public_id": result.get("public_id"),
             "duration": int(result.get("duration", 0)),
             "context": result.get("context", {}),
         }
     except cloudinary.exceptions.NotFound:
-        return None
+        audio = None
     except Exception:
+        # Transient errors are not cached
         return None
 
+    _audio_cache.set(track_id, audio, ttl=TRACK_HIT_TTL if audio else TRACK_MISS_TTL)
+    return audio
+
+
+def find_existing_audio(title: str, artist: str) -> tuple[str, dict | None]:
+    """Resolve the track_id for a title/artist, preferring an already uploaded copy.
+
+    Falls back to the legacy MD5 ID so tracks uploaded before the ID change
+    are still found. Returns the new-style ID when nothing exists yet.
+    """
+    track_id = generate_track_id(title, artist)
+    existing_audio = check_audio_exists(track_id)
+    if existing_audio:
+        return track_id, existing_audio
+
+    legacy_id = generate_legacy_track_id(title, artist)
+    legacy_audio = check_audio_exists(legacy_id)
+    if legacy_audio:
+        return legacy_id, legacy_audio
+
+    return track_id, None
+
 
 def get_track_metadata(track_id: str) -> dict | None:
     """Get metadata for a single track by track_id."""
@@ -77,16 +159,31 @@ def get_track_metadata(track_id: str) -> dict | None:
 
 
 def check_thumbnail_exists(track_id: str) -> str | None:
+    cached = _thumbnail_cache.get(track_id, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
     try:
         result = cloudinary.api.resource(
             f"peerless_music/thumbnails/{track_id}", resource_type="image"
         )
-        return result.get("secure_url")
+        thumbnail_url = result.get("secure_url")
     except cloudinary.exceptions.NotFound:
-        return None
+        thumbnail_url = None
     except Exception:
+        # Transient errors are not cached
         return None
 
+    _thumbnail_cache.set(
+        track_id, thumbnail_url, ttl=TRACK_HIT_TTL if thumbnail_url else TRACK_MISS_TTL
+    )
+    return thumbnail_url
+
+
+def _invalidate_track_cache(track_id: str) -> None:
+    _audio_cache.pop(track_id)
+    _thumbnail_cache.pop(track_id)
+
 
 def upload_audio(
     file_path: str, track_id: str, title: str = "", artist: str = ""
@@ -105,6 +202,7 @@ def upload_audio(
         format="mp3",
         context=context if context else None,
     )
+    _invalidate_track_cache(track_id)
     return {
         "audio_url": result.get("secure_url"),
         "public_id": result.get("public_id"),
@@ -123,6 +221,7 @@ def upload_thumbnail(file_path: str, track_id: str) -> str:
             {"quality": "auto:best"},
         ],
     )
+    _invalidate_track_cache(track_id)
     return result.get("secure_url")
 
 
@@ -137,83 +236,167 @@ def upload_thumbnail_from_url(url: str, track_id: str) -> str:
             {"quality": "auto:best"},
         ],
     )
+    _invalidate_track_cache(track_id)
     return result.get("secure_url")
 
 
-def get_all_tracks() -> list[dict]:
-    """Fetch all audio tracks from Cloudinary library."""
-    try:
-        # Get all audio files from peerless_music/audio folder
-        # Use 'image_metadata' to get duration info
+def get_thumbnail_fetch_url(url: str) -> str:
+    """Build a Cloudinary fetch URL that serves a remote image as a 500x500 cover.
+
+    Nothing is uploaded or stored; Cloudinary fetches and transforms the image
+    on first delivery and caches it on the CDN. Use upload_thumbnail_from_url
+    when the thumbnail must persist alongside the track (e.g. for the library).
+    """
+    fetch_url, _ = cloudinary.utils.cloudinary_url(
+        url,
+        type="fetch",
+        secure=True,
+        transformation=[
+            {"width": 500, "height": 500, "crop": "fill"},
+            {"quality": "auto:best"},
+        ],
+    )
+    return fetch_url
+
+
+def _list_thumbnails() -> dict[str, str]:
+    """List every uploaded thumbnail once, keyed by track_id."""
+    thumbnails = {}
+    next_cursor = None
+    while True:
         result = cloudinary.api.resources(
             type="upload",
-            resource_type="video",
-            prefix="peerless_music/audio/",
-            max_results=100,
-            context=True,
-            tags=True,
+            resource_type="image",
+            prefix="peerless_music/thumbnails/",
+            max_results=500,
+            next_cursor=next_cursor,
         )
-
-        tracks = []
         for resource in result.get("resources", []):
             track_id = resource.get("public_id", "").replace(
-                "peerless_music/audio/", ""
+                "peerless_music/thumbnails/", ""
             )
+            thumbnails[track_id] = resource.get("secure_url")
 
-            # Get the corresponding thumbnail
-            thumbnail_url = check_thumbnail_exists(track_id)
-            if not thumbnail_url:
-                # Use video thumbnail as fallback
-                thumbnail_url = f"https://res.cloudinary.com/{CLOUDINARY_CLOUD_NAME}/video/upload/so_0/{resource.get('public_id')}.jpg"
-
-            # Extract metadata from context if available
-            context = resource.get("context", {})
-            if isinstance(context, dict):
-                custom = context.get("custom", {})
-            else:
-                custom = {}
-
-            title = (
-                custom.get("title") if custom.get("title") else f"Track {track_id[:8]}"
+        next_cursor = result.get("next_cursor")
+        if not next_cursor:
+            return thumbnails
+
+
+def _build_library_track(resource: dict, thumbnails: dict[str, str]) -> dict:
+    """Build a library entry for one audio resource, resolving thumbnail and duration."""
+    track_id = resource.get("public_id", "").replace("peerless_music/audio/", "")
+
+    # Get the corresponding thumbnail
+    thumbnail_url = thumbnails.get(track_id)
+    if not thumbnail_url:
+        # Use video thumbnail as fallback
+        thumbnail_url = f"https://res.cloudinary.com/{CLOUDINARY_CLOUD_NAME}/video/upload/so_0/{resource.get('public_id')}.jpg"
+
+    # Extract metadata from context if available
+    context = resource.get("context", {})
+    if isinstance(context, dict):
+        custom = context.get("custom", {})
+    else:
+        custom = {}
+
+    title = custom.get("title") if custom.get("title") else f"Track {track_id[:8]}"
+    artist = custom.get("artist") if custom.get("artist") else "Unknown Artist"
+
+    # Duration is directly in the resource for video types
+    duration = int(resource.get("duration", 0))
+
+    # If duration is 0, try to get it from individual resource call
+    if duration == 0:
+        try:
+            detailed = cloudinary.api.resource(
+                resource.get("public_id"), resource_type="video"
             )
-            artist = custom.get("artist") if custom.get("artist") else "Unknown Artist"
-
-            # Duration is directly in the resource for video types
-            duration = int(resource.get("duration", 0))
-
-            # If duration is 0, try to get it from individual resource call
-            if duration == 0:
-                try:
-                    detailed = cloudinary.api.resource(
-                        resource.get("public_id"), resource_type="video"
-                    )
-                    duration = int(detailed.get("duration", 0))
-                except Exception:
-                    pass
-
-            tracks.append(
-                {
-                    "track_id": track_id,
-                    "title": title,
-                    "artist": artist,
-                    "thumbnail": thumbnail_url,
-                    "duration": duration,
-                    "audio_url": resource.get("secure_url"),
-                    "created_at": resource.get("created_at"),
-                }
+            duration = int(detailed.get("duration", 0))
+        except Exception:
+            pass
+
+    return {
+        "track_id": track_id,
+        "title": title,
+        "artist": artist,
+        "thumbnail": thumbnail_url,
+        "duration": duration,
+        "audio_url": resource.get("secure_url"),
+        "created_at": resource.get("created_at"),
+    }
+
+
+def _list_audio_page(page_size: int, next_cursor: str | None = None) -> dict:
+    """One page of audio resources from the peerless_music/audio folder."""
+    return cloudinary.api.resources(
+        type="upload",
+        resource_type="video",
+        prefix="peerless_music/audio/",
+        max_results=page_size,
+        next_cursor=next_cursor,
+        context=True,
+        tags=True,
+    )
+
+
+def _load_thumbnails() -> dict[str, str]:
+    # One listing call replaces a per-track thumbnail lookup
+    try:
+        return _list_thumbnails()
+    except Exception as e:
+        print(f"Error listing thumbnails from Cloudinary: {e}")
+        return {}
+
+
+def _build_library_tracks(resources: list[dict], thumbnails: dict[str, str]) -> list[dict]:
+    """Build library entries for a page of resources, newest first."""
+    # Remaining per-track lookups are network-bound, so fan them out
+    with ThreadPoolExecutor(max_workers=LIBRARY_LOOKUP_WORKERS) as executor:
+        tracks = list(
+            executor.map(
+                lambda resource: _build_library_track(resource, thumbnails),
+                resources,
             )
+        )
+
+    # Sort by created_at (newest first)
+    tracks.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    return tracks
 
-        # Sort by created_at (newest first)
-        tracks.sort(key=lambda x: x.get("created_at", ""), reverse=True)
 
-        return tracks
+def get_all_tracks() -> list[dict]:
+    """Fetch all audio tracks from Cloudinary library."""
+    try:
+        result = _list_audio_page(100)
+        return _build_library_tracks(result.get("resources", []), _load_thumbnails())
     except Exception as e:
         print(f"Error fetching tracks from Cloudinary: {e}")
         return []
 
 
+def iter_library_pages(page_size: int = 200) -> Iterator[list[dict]]:
+    """Yield the whole library one Cloudinary page at a time.
+
+    Pages are fetched lazily as the consumer iterates, so only one page of
+    tracks is held in memory. Errors end the iteration early.
+    """
+    thumbnails = _load_thumbnails()
+    next_cursor = None
+    try:
+        while True:
+            result = _list_audio_page(page_size, next_cursor)
+            yield _build_library_tracks(result.get("resources", []), thumbnails)
+
+            next_cursor = result.get("next_cursor")
+            if not next_cursor:
+                return
+    except Exception as e:
+        print(f"Error streaming tracks from Cloudinary: {e}")
+
+
 def delete_track(track_id: str) -> bool:
     """Delete a track and its thumbnail from Cloudinary."""
+    _invalidate_track_cache(track_id)
     try:
         # Delete audio file
         audio_public_id = f"peerless_music/audio/{track_id}"
@@ -235,3 +418,34 @@ def delete_track(track_id: str) -> bool:
     except Exception as e:
         print(f"Error deleting track {track_id}: {e}")
         return False
+
+
+def bulk_delete_tracks(track_ids: list[str]) -> bool:
+    """Delete many tracks and their thumbnails with batched Admin API calls."""
+    if not track_ids:
+        return True
+
+    success = True
+    # delete_resources accepts at most 100 public IDs per call
+    for start in range(0, len(track_ids), 100):
+        batch = track_ids[start : start + 100]
+        for track_id in batch:
+            _invalidate_track_cache(track_id)
+
+        audio_ids = [f"peerless_music/audio/{t}" for t in batch]
+        try:
+            cloudinary.api.delete_resources(audio_ids, resource_type="video")
+            print(f"✓ Deleted {len(audio_ids)} audio file(s)")
+        except Exception as e:
+            print(f"⚠ Audio bulk delete failed: {e}")
+            success = False
+
+        thumbnail_ids = [f"peerless_music/thumbnails/{t}" for t in batch]
+        try:
+            cloudinary.api.delete_resources(thumbnail_ids, resource_type="image")
+            print(f"✓ Deleted {len(thumbnail_ids)} thumbnail(s)")
+        except Exception as e:
+            print(f"⚠ Thumbnail bulk delete failed: {e}")
+            success = False
+
+    return success
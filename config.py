@@ -7,3 +7,11 @@ CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 BACKEND_PORT = int(os.getenv("BACKEND_PORT", 8000))
+# Optional; when unset, caches and locks stay in-process (single worker only)
+REDIS_URL = os.getenv("REDIS_URL")
+# Comma-separated allow-list of frontend origins; when unset any http(s)
+# origin is accepted (dev)
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()]
+# Two-pass loudnorm (measure, then normalize linearly) for tracks that are
+# mastered from a downloaded file; costs an extra decode per new track
+LOUDNORM_TWO_PASS = os.getenv("LOUDNORM_TWO_PASS", "").lower() in ("1", "true", "yes")
@@ -5,32 +5,317 @@ Also tracks failed track uploads for manual resolution.
 """
 
 import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+from cache import TTLCache
+
 # Database file path
 DB_PATH = os.getenv(
     "DATABASE_URL", os.path.join(os.path.dirname(__file__), "peerless_music.db")
 )
 
 
-@contextmanager
-def get_db():
-    """Get database connection context manager."""
-    conn = sqlite3.connect(DB_PATH)
+# Hot-path SQL kept as module constants so the connection's statement cache hits
+_SQL_PLAYLISTS_WITH_TRACKS = """
+    SELECT p.id, p.user_id, p.name, p.description, p.cover_image,
+           p.created_at, p.updated_at,
+           pt.video_id, pt.title, pt.artist, pt.thumbnail, pt.duration, pt.position
+    FROM playlists p
+    LEFT JOIN playlist_tracks pt ON p.id = pt.playlist_id
+"""
+_SQL_GET_PLAYLIST = (
+    _SQL_PLAYLISTS_WITH_TRACKS + "WHERE p.id = ? ORDER BY pt.position"
+)
+_SQL_GET_USER_PLAYLISTS = (
+    _SQL_PLAYLISTS_WITH_TRACKS
+    + "WHERE p.user_id = ? ORDER BY p.updated_at DESC, p.id, pt.position"
+)
+
+# Explicit column lists: password_hash only leaves the database for login, and
+# failed-track listings can skip the long error text
+_IDENTITY_PUBLIC_COLS = "id, username, display_name, created_at, updated_at"
+_IDENTITY_AUTH_COLS = _IDENTITY_PUBLIC_COLS + ", password_hash"
+_FAILED_TRACK_BRIEF_COLS = (
+    "id, video_id, video_title, artist, duration, status, created_at, "
+    "resolved_at, track_id"
+)
+_FAILED_TRACK_COLS = _FAILED_TRACK_BRIEF_COLS + ", thumbnail_url, error_message"
+
+_SQL_GET_IDENTITY_FOR_AUTH = (
+    f"SELECT {_IDENTITY_AUTH_COLS} FROM identities WHERE username = ?"
+)
+_SQL_GET_IDENTITY_PUBLIC = f"SELECT {_IDENTITY_PUBLIC_COLS} FROM identities WHERE id = ?"
+_SQL_USERNAME_EXISTS = "SELECT 1 FROM identities WHERE username = ?"
+_SQL_GET_FAILED_TRACK = f"SELECT {_FAILED_TRACK_COLS} FROM failed_tracks WHERE video_id = ?"
+# Re-failing a track updates its row in place (keeping its id) and resets it
+# to pending, rather than INSERT OR REPLACE's delete + re-insert
+_SQL_UPSERT_FAILED_TRACK = """
+    INSERT INTO failed_tracks
+    (video_id, video_title, artist, thumbnail_url, duration, error_message, track_id, status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', CURRENT_TIMESTAMP)
+    ON CONFLICT(video_id) DO UPDATE SET
+        video_title = excluded.video_title,
+        artist = excluded.artist,
+        thumbnail_url = excluded.thumbnail_url,
+        duration = excluded.duration,
+        error_message = excluded.error_message,
+        track_id = excluded.track_id,
+        status = 'pending',
+        created_at = CURRENT_TIMESTAMP,
+        resolved_at = NULL
+"""
+
+
+# Variable-length IN (...) statements, built once per distinct id count so the
+# same SQL text (and cached statement) is reused
+@lru_cache(maxsize=64)
+def _sql_get_playlists_by_ids(count: int) -> str:
+    placeholders = ",".join("?" * count)
+    return (
+        _SQL_PLAYLISTS_WITH_TRACKS
+        + f"WHERE p.id IN ({placeholders}) ORDER BY p.updated_at DESC, p.id, pt.position"
+    )
+
+
+# update_playlist statements for every combination of fields being set, keyed
+# by bitmask (1 = name, 2 = description, 4 = cover_image)
+_UPDATE_PLAYLIST_FIELDS = ("name", "description", "cover_image")
+_SQL_UPDATE_PLAYLIST = {
+    mask: "UPDATE playlists SET "
+    + "".join(
+        f"{field} = ?, "
+        for bit, field in enumerate(_UPDATE_PLAYLIST_FIELDS)
+        if mask & (1 << bit)
+    )
+    + "updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING *"
+    for mask in range(1, 1 << len(_UPDATE_PLAYLIST_FIELDS))
+}
+
+
+@lru_cache(maxsize=64)
+def _sql_assign_playlists(count: int) -> str:
+    placeholders = ",".join("?" * count)
+    return f"""
+        UPDATE playlists SET user_id = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id IN ({placeholders}) AND user_id IS NULL
+    """
+
+
+# WAL allows many concurrent readers alongside a single writer, so reads are
+# served from a pool of query_only connections and all writes go through one
+# dedicated connection guarded by a lock.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", os.cpu_count() or 4))
+# Longest a read waits for a free reader before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+_read_pool: queue.Queue = queue.Queue(maxsize=DB_POOL_SIZE)
+_read_pool_lock = threading.Lock()
+_read_pool_opened = 0
+_writer: Optional[sqlite3.Connection] = None
+_write_lock = threading.Lock()
+# Connection currently checked out by this thread, if any
+_held = threading.local()
+
+# Set once init_db() has created the schema in this process
+_initialized = False
+
+# Lookup caches for rows read on every auth / failed-track request. Entries
+# are only ever positive hits and writes in this module evict them; the TTL
+# bounds staleness from writes made by other worker processes.
+# DB_CACHE_SIZE=0 disables them.
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", 1024))
+_identity_cache = TTLCache(maxsize=DB_CACHE_SIZE, ttl=300) if DB_CACHE_SIZE else None
+_failed_track_cache = (
+    TTLCache(maxsize=DB_CACHE_SIZE * 4, ttl=60) if DB_CACHE_SIZE else None
+)
+
+# Stored in PRAGMA user_version. Bump when the schema below changes so existing
+# database files re-run the (idempotent) CREATE statements once.
+SCHEMA_VERSION = 5
+
+
+def _connect(read_only: bool = False) -> sqlite3.Connection:
+    """Open a connection and apply the per-connection PRAGMAs."""
+    # Writes take the write lock up front (BEGIN IMMEDIATE) rather than
+    # upgrading mid-transaction, which can fail with SQLITE_BUSY under load
+    conn = sqlite3.connect(
+        DB_PATH,
+        check_same_thread=False,
+        cached_statements=256,
+        isolation_level="IMMEDIATE",
+    )
     conn.row_factory = sqlite3.Row
+    if read_only:
+        # Any accidental write on a reader raises instead of contending
+        conn.execute("PRAGMA query_only=ON")
+    else:
+        # journal_mode is persistent in the file; the writer sets it
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")  # ~64 MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")
+    # Off by default in SQLite; needed for ON DELETE CASCADE on playlist_tracks
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _acquire_reader() -> sqlite3.Connection:
+    """Take a pooled reader, opening a new one while under the pool size."""
+    global _read_pool_opened
+    try:
+        return _read_pool.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _read_pool_lock:
+        can_open = _read_pool_opened < DB_POOL_SIZE
+        if can_open:
+            _read_pool_opened += 1
+    if can_open:
+        try:
+            return _connect(read_only=True)
+        except Exception:
+            with _read_pool_lock:
+                _read_pool_opened -= 1
+            raise
+    try:
+        return _read_pool.get(timeout=DB_POOL_TIMEOUT)
+    except queue.Empty:
+        raise sqlite3.OperationalError(
+            f"no database reader free after {DB_POOL_TIMEOUT}s"
+        ) from None
+
+
+def _release_reader(conn: sqlite3.Connection) -> None:
+    """Return a reader to the pool, never with a transaction left open."""
+    global _read_pool_opened
+    if conn.in_transaction:
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            # Unusable connection: drop it so the pool can open a fresh one
+            conn.close()
+            with _read_pool_lock:
+                _read_pool_opened -= 1
+            return
+    _read_pool.put(conn)
+
+
+def _release_writer(conn: sqlite3.Connection) -> None:
+    """Roll back anything left uncommitted; reopen later if that fails."""
+    global _writer
+    if conn.in_transaction:
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            _writer = None
+
+
+@contextmanager
+def get_db(write: bool = False):
+    """Get database connection context manager.
+
+    Reads use a pooled query_only connection; pass write=True for anything
+    that modifies the database. Nested calls on the same thread (e.g. a write
+    that re-reads the playlist) reuse the connection already held, so the
+    re-read sees the write.
+    """
+    global _writer
+    held = getattr(_held, "conn", None)
+    held_write = getattr(_held, "write", False)
+    if held is not None and (held_write or not write):
+        yield held
+        return
+
+    if write:
+        with _write_lock:
+            if _writer is None:
+                _writer = _connect()
+            conn = _writer
+            _held.conn, _held.write = conn, True
+            try:
+                yield conn
+            finally:
+                _held.conn, _held.write = held, held_write
+                _release_writer(conn)
+        return
+
+    conn = _acquire_reader()
+    _held.conn, _held.write = conn, False
     try:
         yield conn
     finally:
-        conn.close()
+        _held.conn, _held.write = None, False
+        _release_reader(conn)
+
+
+# One-shot helpers for single-statement functions: same connection rules as
+# get_db(), without the generator-based context manager on every call
+
+
+def _read_conn() -> tuple[sqlite3.Connection, bool]:
+    """Pick the connection for a read; the bool says whether to release it."""
+    conn = getattr(_held, "conn", None)
+    if conn is not None:
+        return conn, False
+    return _acquire_reader(), True
+
+
+def _fetchone(sql: str, params=()) -> Optional[sqlite3.Row]:
+    conn, owned = _read_conn()
+    try:
+        return conn.execute(sql, params).fetchone()
+    finally:
+        if owned:
+            _release_reader(conn)
+
+
+def _execute(sql: str, params=()) -> int:
+    """Run one write statement and commit it. Returns the affected row count."""
+    global _writer
+    if getattr(_held, "write", False):
+        # Inside a get_db(write=True) block: the caller owns the transaction
+        return _held.conn.execute(sql, params).rowcount
+
+    with _write_lock:
+        if _writer is None:
+            _writer = _connect()
+        conn = _writer
+        try:
+            rowcount = conn.execute(sql, params).rowcount
+            conn.commit()
+            return rowcount
+        finally:
+            _release_writer(conn)
 
 
 def init_db():
-    """Initialize database tables."""
-    with get_db() as conn:
+    """Initialize database tables. Safe to call more than once per process."""
+    global _initialized
+    if _initialized:
+        return
+
+    with get_db(write=True) as conn:
+        # Schema already current in this file: one integer read, no DDL
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            _initialized = True
+            return
+
         cursor = conn.cursor()
+        # DDL does not open a transaction implicitly; take the write lock so
+        # concurrent workers run the schema setup one at a time
+        cursor.execute("BEGIN IMMEDIATE")
+        if cursor.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            conn.rollback()
+            _initialized = True
+            return
 
         # Create identities table (for optional username/password auth)
         cursor.execute("""
@@ -95,67 +380,138 @@ def init_db():
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_playlists_user_id ON playlists(user_id)
         """)
+        # (playlist_id, position) serves both the filter and the ORDER BY, and
+        # is what the ON DELETE CASCADE lookup uses, so the single-column
+        # playlist_id index is redundant
+        cursor.execute("DROP INDEX IF EXISTS idx_playlist_tracks_playlist_id")
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_playlist_tracks_playlist_id ON playlist_tracks(playlist_id)
+            CREATE INDEX IF NOT EXISTS idx_playlist_tracks_playlist_pos ON playlist_tracks(playlist_id, position)
         """)
         cursor.execute("""
             CREATE UNIQUE INDEX IF NOT EXISTS idx_identities_username ON identities(username)
         """)
+        # Cover get_all_failed_tracks (with and without status) including its
+        # ORDER BY and keyset cursor, so a page reads only `limit` index entries
+        cursor.execute("DROP INDEX IF EXISTS idx_failed_tracks_status")
+        cursor.execute("DROP INDEX IF EXISTS idx_failed_tracks_status_created")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_failed_tracks_status_page ON failed_tracks(status, created_at DESC, id DESC)
+        """)
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_failed_tracks_status ON failed_tracks(status)
+            CREATE INDEX IF NOT EXISTS idx_failed_tracks_page ON failed_tracks(created_at DESC, id DESC)
         """)
         cursor.execute("""
             CREATE UNIQUE INDEX IF NOT EXISTS idx_failed_tracks_video_id ON failed_tracks(video_id)
         """)
+        # Partial index holding only pending rows, for the pending count/check
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_failed_tracks_pending ON failed_tracks(status) WHERE status = 'pending'
+        """)
+
+        # Tracks left behind by playlists deleted before foreign keys were
+        # enforced; the cascade keeps this empty from now on
+        cursor.execute("""
+            DELETE FROM playlist_tracks
+            WHERE playlist_id NOT IN (SELECT id FROM playlists)
+        """)
 
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
+        _initialized = True
         print(f"Database initialized at {DB_PATH}")
 
 
 # ============== Identity Operations ==============
 
 
+def _cached_identity(key: tuple) -> Optional[dict]:
+    if _identity_cache is None:
+        return None
+    identity = _identity_cache.get(key)
+    # Hand out copies so callers cannot mutate the cached entry
+    return dict(identity) if identity is not None else None
+
+
+def _cache_identity(key: tuple, identity: dict) -> None:
+    if _identity_cache is not None:
+        _identity_cache.set(key, dict(identity))
+
+
 def create_identity(
     user_id: str, username: str, password_hash: str, display_name: str = None
 ) -> dict:
-    """Create a new identity."""
-    with get_db() as conn:
+    """Create a new identity. Returns its public fields."""
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            """
+            f"""
             INSERT INTO identities (id, username, password_hash, display_name)
             VALUES (?, ?, ?, ?)
+            RETURNING {_IDENTITY_PUBLIC_COLS}
         """,
             (user_id, username, password_hash, display_name or username),
         )
+        identity = dict(cursor.fetchone())
         conn.commit()
-        return get_identity_by_id(user_id)
+        _cache_identity(("public", user_id), identity)
+        return identity
 
 
-def get_identity_by_username(username: str) -> Optional[dict]:
-    """Get identity by username."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM identities WHERE username = ?", (username,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+def get_identity_for_auth(username: str) -> Optional[dict]:
+    """Get identity by username, including its password hash (for login)."""
+    cached = _cached_identity(("auth", username))
+    if cached is not None:
+        return cached
 
+    row = _fetchone(_SQL_GET_IDENTITY_FOR_AUTH, (username,))
+    if not row:
+        return None
+    identity = dict(row)
+    _cache_identity(("auth", username), identity)
+    return identity
 
-def get_identity_by_id(user_id: str) -> Optional[dict]:
-    """Get identity by ID."""
-    with get_db() as conn:
+
+def get_identity_public(user_id: str) -> Optional[dict]:
+    """Get identity by ID, without the password hash."""
+    cached = _cached_identity(("public", user_id))
+    if cached is not None:
+        return cached
+
+    row = _fetchone(_SQL_GET_IDENTITY_PUBLIC, (user_id,))
+    if not row:
+        return None
+    identity = dict(row)
+    _cache_identity(("public", user_id), identity)
+    return identity
+
+
+def update_identity_password_hash(user_id: str, password_hash: str) -> None:
+    """Replace the stored password hash for an identity."""
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM identities WHERE id = ?", (user_id,))
+        cursor.execute(
+            """
+            UPDATE identities SET password_hash = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            RETURNING username
+        """,
+            (password_hash, user_id),
+        )
         row = cursor.fetchone()
-        return dict(row) if row else None
+        conn.commit()
+
+    if _identity_cache is not None:
+        _identity_cache.pop(("public", user_id))
+        if row:
+            _identity_cache.pop(("auth", row["username"]))
 
 
 def username_exists(username: str) -> bool:
     """Check if username already exists."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM identities WHERE username = ?", (username,))
-        return cursor.fetchone() is not None
+    if _identity_cache is not None and _identity_cache.get(("auth", username)):
+        return True
+
+    return _fetchone(_SQL_USERNAME_EXISTS, (username,)) is not None
 
 
 # ============== Playlist Operations ==============
@@ -163,88 +519,100 @@ def username_exists(username: str) -> bool:
 
 def create_playlist(user_id: Optional[str], name: str, description: str = None) -> dict:
     """Create a new playlist. user_id is optional for anonymous playlists."""
-    import uuid
-
-    playlist_id = str(uuid.uuid4())[:16]
-
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
+        # 16 hex char id generated by SQLite; RETURNING hands back the new row
+        # so there is no re-read
         cursor.execute(
             """
             INSERT INTO playlists (id, user_id, name, description)
-            VALUES (?, ?, ?, ?)
+            VALUES (lower(hex(randomblob(8))), ?, ?, ?)
+            RETURNING *
         """,
-            (playlist_id, user_id, name, description),
+            (user_id, name, description),
         )
+        playlist = dict(cursor.fetchone())
         conn.commit()
 
-        return get_playlist(playlist_id)
+    # A new playlist has no tracks yet
+    playlist["track_count"] = 0
+    playlist["tracks"] = []
+    return playlist
+
+
+def _group_playlist_rows(rows) -> list[dict]:
+    """Fold playlist LEFT JOIN playlist_tracks rows into playlists with tracks.
+
+    Expects plain tuples in _SQL_PLAYLISTS_WITH_TRACKS column order (cursor
+    row_factory = None), which skips sqlite3.Row's per-column name lookup.
+    """
+    playlists = []
+    current = None
+    current_id = None
+    for (
+        playlist_id,
+        user_id,
+        name,
+        description,
+        cover_image,
+        created_at,
+        updated_at,
+        video_id,
+        title,
+        artist,
+        thumbnail,
+        duration,
+        position,
+    ) in rows:
+        if current is None or current_id != playlist_id:
+            current_id = playlist_id
+            current = {
+                "id": playlist_id,
+                "user_id": user_id,
+                "name": name,
+                "description": description,
+                "cover_image": cover_image,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "track_count": 0,
+                "tracks": [],
+            }
+            playlists.append(current)
+
+        # Playlists without tracks produce one row of NULL track columns
+        if video_id is not None:
+            current["tracks"].append(
+                {
+                    "video_id": video_id,
+                    "title": title,
+                    "artist": artist,
+                    "thumbnail": thumbnail,
+                    "duration": duration,
+                    "position": position,
+                }
+            )
+            current["track_count"] += 1
+
+    return playlists
 
 
 def get_playlist(playlist_id: str) -> Optional[dict]:
     """Get playlist by ID with tracks."""
     with get_db() as conn:
         cursor = conn.cursor()
-
-        # Get playlist
-        cursor.execute("SELECT * FROM playlists WHERE id = ?", (playlist_id,))
-        playlist_row = cursor.fetchone()
-        if not playlist_row:
-            return None
-
-        playlist = dict(playlist_row)
-
-        # Get tracks
-        cursor.execute(
-            """
-            SELECT video_id, title, artist, thumbnail, duration, position
-            FROM playlist_tracks
-            WHERE playlist_id = ?
-            ORDER BY position
-        """,
-            (playlist_id,),
-        )
-
-        tracks = [dict(row) for row in cursor.fetchall()]
-        playlist["tracks"] = tracks
-
-        return playlist
+        cursor.row_factory = None
+        cursor.execute(_SQL_GET_PLAYLIST, (playlist_id,))
+        playlists = _group_playlist_rows(cursor.fetchall())
+        return playlists[0] if playlists else None
 
 
 def get_user_playlists(user_id: str) -> list[dict]:
     """Get all playlists for a user."""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT p.*, COUNT(pt.id) as track_count
-            FROM playlists p
-            LEFT JOIN playlist_tracks pt ON p.id = pt.playlist_id
-            WHERE p.user_id = ?
-            GROUP BY p.id
-            ORDER BY p.updated_at DESC
-        """,
-            (user_id,),
-        )
-
-        playlists = []
-        for row in cursor.fetchall():
-            playlist = dict(row)
-            # Get tracks for each playlist
-            cursor2 = conn.cursor()
-            cursor2.execute(
-                """
-                SELECT video_id, title, artist, thumbnail, duration, position
-                FROM playlist_tracks
-                WHERE playlist_id = ?
-                ORDER BY position
-            """,
-                (playlist["id"],),
-            )
-            playlist["tracks"] = [dict(r) for r in cursor2.fetchall()]
-            playlists.append(playlist)
-
-        return playlists
+        cursor.row_factory = None
+        cursor.execute(_SQL_GET_USER_PLAYLISTS, (user_id,))
+        return _group_playlist_rows(cursor.fetchall())
 
 
 def get_anonymous_playlists(playlist_ids: list[str]) -> list[dict]:
@@ -254,36 +622,9 @@ def get_anonymous_playlists(playlist_ids: list[str]) -> list[dict]:
 
     with get_db() as conn:
         cursor = conn.cursor()
-        placeholders = ",".join("?" * len(playlist_ids))
-        cursor.execute(
-            f"""
-            SELECT p.*, COUNT(pt.id) as track_count
-            FROM playlists p
-            LEFT JOIN playlist_tracks pt ON p.id = pt.playlist_id
-            WHERE p.id IN ({placeholders})
-            GROUP BY p.id
-            ORDER BY p.updated_at DESC
-        """,
-            playlist_ids,
-        )
-
-        playlists = []
-        for row in cursor.fetchall():
-            playlist = dict(row)
-            cursor2 = conn.cursor()
-            cursor2.execute(
-                """
-                SELECT video_id, title, artist, thumbnail, duration, position
-                FROM playlist_tracks
-                WHERE playlist_id = ?
-                ORDER BY position
-            """,
-                (playlist["id"],),
-            )
-            playlist["tracks"] = [dict(r) for r in cursor2.fetchall()]
-            playlists.append(playlist)
-
-        return playlists
+        cursor.row_factory = None
+        cursor.execute(_sql_get_playlists_by_ids(len(playlist_ids)), playlist_ids)
+        return _group_playlist_rows(cursor.fetchall())
 
 
 def assign_playlists_to_user(playlist_ids: list[str], user_id: str) -> int:
@@ -291,67 +632,73 @@ def assign_playlists_to_user(playlist_ids: list[str], user_id: str) -> int:
     if not playlist_ids:
         return 0
 
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
-        placeholders = ",".join("?" * len(playlist_ids))
         cursor.execute(
-            f"""
-            UPDATE playlists SET user_id = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id IN ({placeholders}) AND user_id IS NULL
-        """,
-            [user_id] + playlist_ids,
+            _sql_assign_playlists(len(playlist_ids)), [user_id] + playlist_ids
         )
         conn.commit()
         return cursor.rowcount
 
 
 def update_playlist(
-    playlist_id: str, name: str = None, description: str = None, cover_image: str = None
+    playlist_id: str,
+    name: str = None,
+    description: str = None,
+    cover_image: str = None,
+    return_full: bool = True,
 ) -> Optional[dict]:
-    """Update playlist details."""
-    with get_db() as conn:
+    """Update playlist details. Returns None if the playlist does not exist.
+
+    With return_full=False only the updated playlist row is returned (no
+    tracks), taken from the UPDATE itself instead of a second query.
+    """
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
 
-        updates = []
-        params = []
-
-        if name is not None:
-            updates.append("name = ?")
-            params.append(name)
-        if description is not None:
-            updates.append("description = ?")
-            params.append(description)
-        if cover_image is not None:
-            updates.append("cover_image = ?")
-            params.append(cover_image)
-
-        if updates:
-            updates.append("updated_at = CURRENT_TIMESTAMP")
+        values = (name, description, cover_image)
+        mask = 0
+        for bit, value in enumerate(values):
+            if value is not None:
+                mask |= 1 << bit
+
+        if mask:
+            params = [value for value in values if value is not None]
             params.append(playlist_id)
 
-            cursor.execute(
-                f"""
-                UPDATE playlists SET {", ".join(updates)} WHERE id = ?
-            """,
-                params,
-            )
-            conn.commit()
+            with conn:
+                cursor.execute(_SQL_UPDATE_PLAYLIST[mask], params)
+                row = cursor.fetchone()
+            if row is None:
+                return None
+            if not return_full:
+                return dict(row)
 
         return get_playlist(playlist_id)
 
 
 def delete_playlist(playlist_id: str) -> bool:
-    """Delete a playlist and its tracks."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+    """Delete a playlist; its tracks go with it via ON DELETE CASCADE."""
+    return _execute("DELETE FROM playlists WHERE id = ?", (playlist_id,)) > 0
 
 
 # ============== Playlist Track Operations ==============
 
 
+def _touch_playlist(cursor, playlist_id: str, cover_image: str = None) -> bool:
+    """Bump updated_at (and fill an empty cover). False if no such playlist."""
+    cursor.execute(
+        """
+        UPDATE playlists
+        SET cover_image = COALESCE(cover_image, ?), updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        RETURNING id
+    """,
+        (cover_image, playlist_id),
+    )
+    return cursor.fetchone() is not None
+
+
 def add_track_to_playlist(
     playlist_id: str,
     video_id: str,
@@ -359,66 +706,127 @@ def add_track_to_playlist(
     artist: str,
     thumbnail: str,
     duration: int,
-) -> dict:
-    """Add a track to a playlist."""
-    with get_db() as conn:
+    return_full: bool = True,
+) -> Optional[dict]:
+    """Add a track to a playlist. Returns None if the playlist does not exist.
+
+    With return_full=False returns {"track": row} for the inserted track
+    (None if it was already present) instead of re-reading the playlist.
+    """
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
 
-        # Get max position
-        cursor.execute(
-            """
-            SELECT COALESCE(MAX(position), -1) + 1 as next_pos
-            FROM playlist_tracks WHERE playlist_id = ?
-        """,
-            (playlist_id,),
-        )
-        next_pos = cursor.fetchone()["next_pos"]
+        # Bump the playlist (setting the cover if empty) and insert at the next
+        # position (ignore if already exists) in a single transaction. The
+        # UPDATE goes first so a missing playlist is detected without a read.
+        with conn:
+            if not _touch_playlist(cursor, playlist_id, thumbnail):
+                return None
 
-        # Insert track (ignore if already exists)
-        cursor.execute(
-            """
-            INSERT OR IGNORE INTO playlist_tracks
-            (playlist_id, video_id, title, artist, thumbnail, duration, position)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-            (playlist_id, video_id, title, artist, thumbnail, duration, next_pos),
-        )
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO playlist_tracks
+                (playlist_id, video_id, title, artist, thumbnail, duration, position)
+                SELECT ?, ?, ?, ?, ?, ?, COALESCE(MAX(position), -1) + 1
+                FROM playlist_tracks WHERE playlist_id = ?
+                RETURNING *
+            """,
+                (playlist_id, video_id, title, artist, thumbnail, duration, playlist_id),
+            )
+            row = cursor.fetchone()
 
-        # Update playlist cover if empty
-        cursor.execute(
-            """
-            UPDATE playlists
-            SET cover_image = COALESCE(cover_image, ?), updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """,
-            (thumbnail, playlist_id),
-        )
+        if not return_full:
+            return {"track": dict(row) if row else None}
+        return get_playlist(playlist_id)
 
-        conn.commit()
+
+def add_tracks_to_playlist(playlist_id: str, tracks: list[dict]) -> Optional[dict]:
+    """Add many tracks to a playlist in one transaction.
+
+    Each track dict needs video_id, title, artist, thumbnail and duration.
+    Tracks already in the playlist are skipped, as in add_track_to_playlist.
+    Returns None if the playlist does not exist.
+    """
+    if not tracks:
         return get_playlist(playlist_id)
 
+    with get_db(write=True) as conn:
+        cursor = conn.cursor()
 
-def remove_track_from_playlist(playlist_id: str, video_id: str) -> Optional[dict]:
-    """Remove a track from a playlist."""
-    with get_db() as conn:
+        with conn:
+            # BEGIN IMMEDIATE takes the write lock before the position read,
+            # so the read and the inserts are atomic across processes
+            cursor.execute("BEGIN IMMEDIATE")
+            if not _touch_playlist(cursor, playlist_id, tracks[0]["thumbnail"]):
+                return None
+
+            cursor.execute(
+                """
+                SELECT video_id, position FROM playlist_tracks WHERE playlist_id = ?
+            """,
+                (playlist_id,),
+            )
+            rows = cursor.fetchall()
+            seen = {row["video_id"] for row in rows}
+            start = max((row["position"] for row in rows), default=-1) + 1
+
+            # Skip duplicates up front so new tracks get contiguous positions
+            new_tracks = []
+            for track in tracks:
+                if track["video_id"] not in seen:
+                    seen.add(track["video_id"])
+                    new_tracks.append(track)
+
+            cursor.executemany(
+                """
+                INSERT OR IGNORE INTO playlist_tracks
+                (playlist_id, video_id, title, artist, thumbnail, duration, position)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+                [
+                    (
+                        playlist_id,
+                        track["video_id"],
+                        track["title"],
+                        track["artist"],
+                        track["thumbnail"],
+                        track["duration"],
+                        start + i,
+                    )
+                    for i, track in enumerate(new_tracks)
+                ],
+            )
+
+        return get_playlist(playlist_id)
+
+
+def remove_track_from_playlist(
+    playlist_id: str, video_id: str, return_full: bool = True
+) -> Optional[dict]:
+    """Remove a track from a playlist. Returns None if the playlist does not exist.
+
+    With return_full=False returns the removed track row (None if it was not
+    in the playlist) instead of re-reading the playlist.
+    """
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            """
-            DELETE FROM playlist_tracks
-            WHERE playlist_id = ? AND video_id = ?
-        """,
-            (playlist_id, video_id),
-        )
+        # Timestamp bump and delete commit together
+        with conn:
+            if not _touch_playlist(cursor, playlist_id):
+                return None
 
-        # Update playlist timestamp
-        cursor.execute(
-            """
-            UPDATE playlists SET updated_at = CURRENT_TIMESTAMP WHERE id = ?
-        """,
-            (playlist_id,),
-        )
+            cursor.execute(
+                """
+                DELETE FROM playlist_tracks
+                WHERE playlist_id = ? AND video_id = ?
+                RETURNING *
+            """,
+                (playlist_id, video_id),
+            )
+            row = cursor.fetchone()
 
-        conn.commit()
+        if not return_full:
+            return dict(row) if row else None
         return get_playlist(playlist_id)
 
 
@@ -435,14 +843,10 @@ def add_failed_track(
     track_id: str = None,
 ) -> dict:
     """Add a failed track to the database for later manual upload."""
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            """
-            INSERT OR REPLACE INTO failed_tracks
-            (video_id, video_title, artist, thumbnail_url, duration, error_message, track_id, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', CURRENT_TIMESTAMP)
-        """,
+            _SQL_UPSERT_FAILED_TRACK + f"RETURNING {_FAILED_TRACK_COLS}",
             (
                 video_id,
                 video_title,
@@ -453,81 +857,141 @@ def add_failed_track(
                 track_id,
             ),
         )
+        row = cursor.fetchone()
         conn.commit()
-        return get_failed_track(video_id)
+        failed = dict(row)
+        if _failed_track_cache is not None:
+            _failed_track_cache.set(video_id, dict(failed))
+        return failed
+
+
+def add_failed_tracks_bulk(rows: list[tuple]) -> int:
+    """Record many failed tracks in one transaction.
+
+    Each row is (video_id, video_title, artist, thumbnail_url, duration,
+    error_message, track_id). Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+
+    with get_db(write=True) as conn:
+        with conn:
+            conn.executemany(_SQL_UPSERT_FAILED_TRACK, rows)
+
+    if _failed_track_cache is not None:
+        for row in rows:
+            _failed_track_cache.pop(row[0])
+    return len(rows)
 
 
 def get_failed_track(video_id: str) -> Optional[dict]:
     """Get a failed track by video_id."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM failed_tracks WHERE video_id = ?", (video_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
-
+    if _failed_track_cache is not None:
+        cached = _failed_track_cache.get(video_id)
+        if cached is not None:
+            return dict(cached)
+
+    row = _fetchone(_SQL_GET_FAILED_TRACK, (video_id,))
+    if not row:
+        return None
+    failed = dict(row)
+    if _failed_track_cache is not None:
+        _failed_track_cache.set(video_id, dict(failed))
+    return failed
+
+
+def get_all_failed_tracks(
+    status: str = None,
+    brief: bool = False,
+    after: str = None,
+    after_id: int = None,
+    limit: int = None,
+) -> list[dict]:
+    """Get failed tracks newest first, optionally filtered by status.
+
+    brief=True leaves out thumbnail_url and error_message. For keyset
+    pagination pass the created_at and id of the last row seen as
+    after/after_id (created_at alone can tie) along with a limit.
+    """
+    columns = _FAILED_TRACK_BRIEF_COLS if brief else _FAILED_TRACK_COLS
+    conditions, params = [], []
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if after is not None and after_id is not None:
+        conditions.append("(created_at, id) < (?, ?)")
+        params += [after, after_id]
+    elif after is not None:
+        conditions.append("created_at < ?")
+        params.append(after)
+
+    sql = f"SELECT {columns} FROM failed_tracks"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
 
-def get_all_failed_tracks(status: str = None) -> list[dict]:
-    """Get all failed tracks, optionally filtered by status."""
     with get_db() as conn:
         cursor = conn.cursor()
-        if status:
-            cursor.execute(
-                """
-                SELECT * FROM failed_tracks WHERE status = ? ORDER BY created_at DESC
-            """,
-                (status,),
-            )
-        else:
-            cursor.execute("""
-                SELECT * FROM failed_tracks ORDER BY created_at DESC
-            """)
-        return [dict(row) for row in cursor.fetchall()]
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        names = [col[0] for col in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
 
 
 def resolve_failed_track(video_id: str, track_id: str = None) -> Optional[dict]:
     """Mark a failed track as resolved (successfully uploaded)."""
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
         if track_id:
             cursor.execute(
-                """
+                f"""
                 UPDATE failed_tracks
                 SET status = 'resolved', resolved_at = CURRENT_TIMESTAMP, track_id = ?
                 WHERE video_id = ?
+                RETURNING {_FAILED_TRACK_COLS}
             """,
                 (track_id, video_id),
             )
         else:
             cursor.execute(
-                """
+                f"""
                 UPDATE failed_tracks
                 SET status = 'resolved', resolved_at = CURRENT_TIMESTAMP
                 WHERE video_id = ?
+                RETURNING {_FAILED_TRACK_COLS}
             """,
                 (video_id,),
             )
+        row = cursor.fetchone()
         conn.commit()
-        return get_failed_track(video_id)
+        if not row:
+            return None
+        failed = dict(row)
+        if _failed_track_cache is not None:
+            _failed_track_cache.set(video_id, dict(failed))
+        return failed
 
 
 def delete_failed_track(video_id: str) -> bool:
     """Delete a failed track entry."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM failed_tracks WHERE video_id = ?", (video_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+    deleted = _execute("DELETE FROM failed_tracks WHERE video_id = ?", (video_id,))
+    if _failed_track_cache is not None:
+        _failed_track_cache.pop(video_id)
+    return deleted > 0
 
 
 def get_pending_failed_tracks_count() -> int:
     """Get count of pending failed tracks."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT COUNT(*) as count FROM failed_tracks WHERE status = 'pending'"
-        )
-        return cursor.fetchone()["count"]
+    row = _fetchone(
+        "SELECT COUNT(*) as count FROM failed_tracks WHERE status = 'pending'"
+    )
+    return row["count"]
 
 
-# Initialize database on module load
-init_db()
+def has_pending_failed_tracks() -> bool:
+    """Check whether any failed track is still pending (stops at the first)."""
+    row = _fetchone("SELECT 1 FROM failed_tracks WHERE status = 'pending' LIMIT 1")
+    return row is not None
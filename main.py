@@ -1,27 +1,38 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import List, Optional
 
+import orjson
 import uvicorn
 from auth_service import (
     create_token,
+    forget_token,
     generate_user_id,
     hash_password,
+    needs_rehash,
     verify_password,
     verify_token,
 )
+from cache import ResponseCache, TTLCache, acquire_lock, release_lock
 from cloudinary_service import (
-    check_audio_exists,
     check_thumbnail_exists,
+    find_existing_audio,
     generate_track_id,
     get_all_tracks,
+    get_thumbnail_fetch_url,
     get_track_metadata,
+    iter_library_pages,
     upload_audio,
     upload_thumbnail_from_url,
 )
-from config import BACKEND_PORT
+from config import BACKEND_PORT, CORS_ORIGINS, REDIS_URL
 from database import (
     add_failed_track,
     add_track_to_playlist,
+    add_tracks_to_playlist,
     assign_playlists_to_user,
     create_identity,
     create_playlist,
@@ -30,34 +41,70 @@ from database import (
     get_all_failed_tracks,
     get_anonymous_playlists,
     get_failed_track,
-    get_identity_by_id,
-    get_identity_by_username,
+    get_identity_for_auth,
+    get_identity_public,
     get_pending_failed_tracks_count,
     get_playlist,
     get_user_playlists,
+    init_db,
     remove_track_from_playlist,
     resolve_failed_track,
+    update_identity_password_hash,
     update_playlist,
     username_exists,
 )
-from fastapi import BackgroundTasks, Cookie, FastAPI, Header, HTTPException, Response
+from fastapi import (
+    Cookie,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from models import SearchResult, StreamResponse
 from pydantic import BaseModel
 from youtube_service import (
     cleanup_temp_files,
-    download_audio,
-    normalize_audio,
-    search_youtube,
+    close_async_http,
+    download_and_master,
+    search_youtube_async,
 )
 
-track_processing = {}
+# Upper bound on download + normalize + upload; the processing lock expires
+# after this so a crashed worker cannot block a track forever
+TRACK_PROCESSING_TTL = 600
+
+# scrypt hashing/verification (~50-100 ms of CPU each) runs on its own pool so
+# it neither blocks the event loop nor starves the default to_thread pool
+_kdf_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="kdf")
+
+# Track processing runs as background jobs in this worker, keyed by track_id
+# (also the task_id clients poll). /api/stream waits this long for the job
+# before answering 202.
+STREAM_WAIT_SECONDS = float(os.getenv("STREAM_WAIT_SECONDS", 20))
+track_jobs: dict[str, asyncio.Task] = {}
+track_job_results = TTLCache(maxsize=1024, ttl=600)
+
+# Endpoint response cache; entries are fresh for the per-endpoint TTL below
+# and then kept as a fallback for when YouTube/Cloudinary are failing
+response_cache = ResponseCache("response")
+LIBRARY_CACHE_TTL = 30
+SEARCH_CACHE_TTL = 10
+
+# Browser/CDN caching for the polled GET endpoints (revalidated via ETag)
+HTTP_CACHE_CONTROL = "max-age=10, stale-while-revalidate=60"
+# User-edited resources: always revalidate so a user's own change shows at once
+HTTP_NO_CACHE = "no-cache"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    init_db()
     yield
-    track_processing.clear()
+    await close_async_http()
 
 
 app = FastAPI(
@@ -65,15 +112,21 @@ app = FastAPI(
     description="Backend API for Peerless Music streaming service",
     version="1.0.0",
     lifespan=lifespan,
+    # orjson encodes the large list responses (library, playlists) far faster
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[],  # Empty list when using regex or credentials with multiple origins
-    allow_origin_regex="https?://.*",  # Allow all http/https origins for dev
+    # An explicit allow-list is a set lookup; the regex fallback allows all
+    # http/https origins for dev
+    allow_origins=CORS_ORIGINS,
+    allow_origin_regex=None if CORS_ORIGINS else "https?://.*",
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers cache preflight results for a day instead of re-sending OPTIONS
+    max_age=86400,
 )
 
 
@@ -168,28 +221,154 @@ class ResolveFailedTrackRequest(BaseModel):
     track_id: Optional[str] = None
 
 
+async def run_kdf(func, *args):
+    """Run a password hashing function on the KDF thread pool."""
+    return await asyncio.get_running_loop().run_in_executor(_kdf_pool, func, *args)
+
+
+def _extract_token(
+    authorization: Optional[str], peerless_token: Optional[str]
+) -> Optional[str]:
+    # Check Authorization header first
+    if authorization and authorization.startswith("Bearer "):
+        return authorization[7:]
+    # Fall back to cookie
+    return peerless_token or None
+
+
 # Helper to get current user from token
 def get_current_user(
     authorization: Optional[str] = Header(None),
     peerless_token: Optional[str] = Cookie(None),
 ) -> Optional[str]:
     """Extract user ID from JWT token (header or cookie)."""
-    token = None
-
-    # Check Authorization header first
-    if authorization and authorization.startswith("Bearer "):
-        token = authorization[7:]
-    # Fall back to cookie
-    elif peerless_token:
-        token = peerless_token
-
+    token = _extract_token(authorization, peerless_token)
     if not token:
         return None
 
+    # verify_token keeps decoded payloads in a TTL cache, so repeat requests
+    # with the same token skip the signature check
     payload = verify_token(token)
     return payload.get("user_id") if payload else None
 
 
+async def cached_response(key: str, ttl: float, produce):
+    """Return the cached value for `key`, or call `produce()` and cache it.
+
+    The services log and return an empty list on upstream errors, so an empty
+    result is not cached and a stale copy is served in its place if one exists.
+    """
+    cached = await response_cache.get(key)
+    if cached is not None and cached[1]:
+        return cached[0]
+
+    try:
+        value = await produce()
+    except Exception as e:
+        if cached is not None:
+            print(f"Serving stale response for {key}: {e}")
+            return cached[0]
+        raise
+
+    if not value:
+        return cached[0] if cached is not None else value
+    await response_cache.set(key, value, ttl)
+    return value
+
+
+def etag_response(
+    request: Request, payload, cache_control: str = HTTP_CACHE_CONTROL
+) -> Response:
+    """JSON response with an ETag; 304 with no body if the client's copy matches."""
+    body = orjson.dumps(payload)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def process_track(video_id: str, track_id: str, track_info: dict) -> StreamResponse:
+    """Download, normalize and upload a track (the heavy part of /api/stream).
+
+    Runs as a background job; records a failed track on error and always
+    cleans up temp files and releases the processing lock.
+    """
+    audio_path = None
+    try:
+        audio_path, metadata = await download_and_master(video_id)
+        # Audio and thumbnail uploads are independent
+        async with asyncio.TaskGroup() as tg:
+            audio_upload = tg.create_task(
+                asyncio.to_thread(
+                    upload_audio,
+                    audio_path,
+                    track_id,
+                    title=metadata["title"],
+                    artist=metadata["artist"],
+                )
+            )
+            thumbnail_upload = tg.create_task(
+                asyncio.to_thread(
+                    upload_thumbnail_from_url, metadata["thumbnail"], track_id
+                )
+            )
+
+        return StreamResponse(
+            track_id=track_id,
+            title=metadata["title"],
+            artist=metadata["artist"],
+            thumbnail=thumbnail_upload.result(),
+            duration=metadata["duration"],
+            audio_url=audio_upload.result()["audio_url"],
+            cached=False,
+        )
+
+    except Exception as e:
+        # Report the underlying failure rather than the TaskGroup wrapper
+        if isinstance(e, ExceptionGroup):
+            e = e.exceptions[0]
+
+        # Save failed track for manual upload later
+        add_failed_track(
+            video_id=video_id,
+            video_title=track_info["title"],
+            artist=track_info["artist"],
+            thumbnail_url=track_info["thumbnail"],
+            duration=track_info["duration"],
+            error_message=str(e),
+            track_id=track_id,
+        )
+        raise e
+
+    finally:
+        if audio_path:
+            await asyncio.to_thread(cleanup_temp_files, audio_path)
+        await release_lock(f"processing:{track_id}")
+
+
+def _record_track_job(track_id: str, job: asyncio.Task) -> None:
+    track_jobs.pop(track_id, None)
+    if job.cancelled():
+        return
+    error = job.exception()
+    if error is not None:
+        track_job_results.set(track_id, {"status": "failed", "error": str(error)})
+    else:
+        track_job_results.set(track_id, {"status": "done", "result": job.result()})
+
+
+def start_track_job(video_id: str, track_id: str, track_info: dict) -> asyncio.Task:
+    """Start processing a track in the background of this worker."""
+    job = asyncio.create_task(process_track(video_id, track_id, track_info))
+    track_jobs[track_id] = job
+    job.add_done_callback(lambda done: _record_track_job(track_id, done))
+    return job
+
+
 @app.get("/")
 async def root():
     return {"message": "Peerless Music API", "status": "running"}
@@ -199,23 +378,54 @@ async def root():
 async def search_tracks(q: str):
     if not q or len(q.strip()) < 2:
         return []
-    results = search_youtube(q.strip())
+    query = q.strip()
+    results = await cached_response(
+        f"/api/search:{query}",
+        SEARCH_CACHE_TTL,
+        lambda: search_youtube_async(query),
+    )
     return results
 
 
-@app.get("/api/library", response_model=list[LibraryTrack])
-async def get_library():
+# List endpoints below return the service dicts as-is: they are already in
+# response shape, so per-item response_model validation is skipped and the
+# models are kept for the OpenAPI docs only
+
+
+@app.get("/api/library", responses={200: {"model": list[LibraryTrack]}})
+async def get_library(request: Request):
     """Get all tracks from the Cloudinary library."""
-    tracks = get_all_tracks()
-    return tracks
+    tracks = await cached_response(
+        "/api/library", LIBRARY_CACHE_TTL, lambda: asyncio.to_thread(get_all_tracks)
+    )
+    return etag_response(request, tracks)
+
+
+@app.get("/api/library/stream")
+async def stream_library():
+    """Stream the full library as NDJSON, one LibraryTrack per line.
+
+    Cloudinary pages are fetched as the client reads, so large libraries are
+    never held in memory and the first tracks arrive before the last page.
+    """
+
+    def lines():
+        for page in iter_library_pages():
+            for track in page:
+                yield orjson.dumps(track) + b"\n"
+
+    # Sync iterator: Starlette runs it in the threadpool
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @app.get("/api/stream/{video_id}", response_model=StreamResponse)
-async def stream_track(video_id: str, background_tasks: BackgroundTasks):
+async def stream_track(video_id: str):
     # First, check if video_id is actually a track_id (cached track in Cloudinary)
     # This handles playlist tracks that were added from the Library
     # Check if video_id is actually a track_id (cached track in Cloudinary)
-    track_meta = get_track_metadata(video_id)
+    # Cloudinary, YouTube, ffmpeg and yt-dlp calls all block, so they run in
+    # worker threads to keep the event loop serving other requests
+    track_meta = await asyncio.to_thread(get_track_metadata, video_id)
     if track_meta:
         # This is a track_id, not a video_id - return cached track directly
         return StreamResponse(
@@ -229,20 +439,35 @@ async def stream_track(video_id: str, background_tasks: BackgroundTasks):
         )
 
     # Otherwise, treat video_id as a YouTube video ID and search
-    search_results = search_youtube(video_id, max_results=1)
+    search_results = await search_youtube_async(video_id, 1)
 
     if not search_results:
         raise HTTPException(status_code=404, detail="Track not found")
 
     track_info = search_results[0]
-    track_id = generate_track_id(track_info["title"], track_info["artist"])
-
-    existing_audio = check_audio_exists(track_id)
+    # Look up the audio and (speculatively, for the current ID scheme) the
+    # thumbnail at the same time
+    new_track_id = generate_track_id(track_info["title"], track_info["artist"])
+    async with asyncio.TaskGroup() as tg:
+        audio_task = tg.create_task(
+            asyncio.to_thread(
+                find_existing_audio, track_info["title"], track_info["artist"]
+            )
+        )
+        thumbnail_task = tg.create_task(
+            asyncio.to_thread(check_thumbnail_exists, new_track_id)
+        )
+    track_id, existing_audio = audio_task.result()
 
     if existing_audio:
-        thumbnail_url = check_thumbnail_exists(track_id)
+        if track_id == new_track_id:
+            thumbnail_url = thumbnail_task.result()
+        else:
+            # Found under the legacy ID
+            thumbnail_url = await asyncio.to_thread(check_thumbnail_exists, track_id)
         if not thumbnail_url:
-            thumbnail_url = track_info["thumbnail"]
+            # No stored cover: serve the YouTube one through Cloudinary fetch
+            thumbnail_url = get_thumbnail_fetch_url(track_info["thumbnail"])
 
         return StreamResponse(
             track_id=track_id,
@@ -254,69 +479,70 @@ async def stream_track(video_id: str, background_tasks: BackgroundTasks):
             cached=True,
         )
 
-    if track_id in track_processing:
-        raise HTTPException(
-            status_code=202,
-            detail="Track is being processed. Please try again shortly.",
-        )
-
-    track_processing[track_id] = True
-
-    try:
-        audio_path, metadata = download_audio(video_id)
-        normalized_path = normalize_audio(audio_path)
-        upload_result = upload_audio(
-            normalized_path,
-            track_id,
-            title=metadata["title"],
-            artist=metadata["artist"],
-        )
-        thumbnail_url = upload_thumbnail_from_url(metadata["thumbnail"], track_id)
-
-        background_tasks.add_task(cleanup_temp_files, normalized_path)
+    if await acquire_lock(f"processing:{track_id}", TRACK_PROCESSING_TTL):
+        start_track_job(video_id, track_id, track_info)
+
+    job = track_jobs.get(track_id)
+    if job is not None:
+        # Short tracks usually finish within the wait and are returned
+        # directly; shield keeps the job running if this request gives up
+        try:
+            return await asyncio.wait_for(asyncio.shield(job), STREAM_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    # Still processing here, or in another worker that holds the lock
+    return JSONResponse(
+        status_code=202,
+        content={
+            "detail": "Track is being processed. Please try again shortly.",
+            "task_id": track_id,
+            "status": "processing",
+        },
+    )
 
-        if track_id in track_processing:
-            del track_processing[track_id]
 
-        return StreamResponse(
-            track_id=track_id,
-            title=metadata["title"],
-            artist=metadata["artist"],
-            thumbnail=thumbnail_url,
-            duration=metadata["duration"],
-            audio_url=upload_result["audio_url"],
-            cached=False,
-        )
+@app.get("/api/stream/status/{task_id}")
+async def stream_status(task_id: str):
+    """Poll a track processing job started by /api/stream (task_id = track_id)."""
+    job = track_jobs.get(task_id)
+    if job is not None and not job.done():
+        return {"task_id": task_id, "status": "processing"}
 
-    except Exception as e:
-        if track_id in track_processing:
-            del track_processing[track_id]
+    result = track_job_results.get(task_id)
+    if result is not None:
+        return {"task_id": task_id, **result}
 
-        # Save failed track for manual upload later
-        add_failed_track(
-            video_id=video_id,
-            video_title=track_info["title"],
-            artist=track_info["artist"],
-            thumbnail_url=track_info["thumbnail"],
-            duration=track_info["duration"],
-            error_message=str(e),
-            track_id=track_id,
+    # Finished in another worker, or longer ago than results are kept
+    track_meta = await asyncio.to_thread(get_track_metadata, task_id)
+    if track_meta:
+        result = StreamResponse(
+            track_id=task_id,
+            title=track_meta["title"],
+            artist=track_meta["artist"],
+            thumbnail=track_meta["thumbnail"],
+            duration=track_meta["duration"],
+            audio_url=track_meta["audio_url"],
+            cached=True,
         )
+        return {"task_id": task_id, "status": "done", "result": result}
 
-        raise HTTPException(status_code=500, detail=str(e))
+    raise HTTPException(status_code=404, detail="Unknown task")
 
 
 @app.get("/api/check/{video_id}")
 async def check_track_cached(video_id: str):
-    search_results = search_youtube(video_id, max_results=1)
+    search_results = await search_youtube_async(video_id, 1)
 
     if not search_results:
         return {"cached": False, "track_id": None}
 
     track_info = search_results[0]
-    track_id = generate_track_id(track_info["title"], track_info["artist"])
-
-    existing_audio = check_audio_exists(track_id)
+    track_id, existing_audio = await asyncio.to_thread(
+        find_existing_audio, track_info["title"], track_info["artist"]
+    )
 
     return {
         "cached": existing_audio is not None,
@@ -349,7 +575,7 @@ async def create_new_identity(data: IdentityCreate, response: Response):
 
     # Create identity
     user_id = generate_user_id()
-    password_hash = hash_password(data.password)
+    password_hash = await run_kdf(hash_password, data.password)
     identity = create_identity(user_id, data.username, password_hash, data.display_name)
 
     # Assign any anonymous playlists
@@ -380,14 +606,19 @@ async def create_new_identity(data: IdentityCreate, response: Response):
 @app.post("/api/identity/login", response_model=IdentityResponse)
 async def login_identity(data: IdentityLogin, response: Response):
     """Login with existing identity."""
-    identity = get_identity_by_username(data.username)
+    identity = get_identity_for_auth(data.username)
 
     if not identity:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    if not verify_password(data.password, identity["password_hash"]):
+    if not await run_kdf(verify_password, data.password, identity["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
+    # Upgrade legacy hashes now that we have the plaintext
+    if needs_rehash(identity["password_hash"]):
+        new_hash = await run_kdf(hash_password, data.password)
+        update_identity_password_hash(identity["id"], new_hash)
+
     # Create token
     token = create_token(identity["id"], identity["username"])
 
@@ -410,8 +641,15 @@ async def login_identity(data: IdentityLogin, response: Response):
 
 
 @app.post("/api/identity/logout")
-async def logout_identity(response: Response):
+async def logout_identity(
+    response: Response,
+    authorization: Optional[str] = Header(None),
+    peerless_token: Optional[str] = Cookie(None),
+):
     """Logout and clear cookie."""
+    token = _extract_token(authorization, peerless_token)
+    if token:
+        forget_token(token)
     response.delete_cookie("peerless_token")
     return {"success": True}
 
@@ -427,7 +665,7 @@ async def get_current_identity(
     if not user_id:
         return {"authenticated": False, "user": None}
 
-    identity = get_identity_by_id(user_id)
+    identity = get_identity_public(user_id)
     if not identity:
         return {"authenticated": False, "user": None}
 
@@ -444,7 +682,7 @@ async def get_current_identity(
 # ============== Playlist Endpoints ==============
 
 
-@app.get("/api/playlists", response_model=List[PlaylistResponse])
+@app.get("/api/playlists", responses={200: {"model": List[PlaylistResponse]}})
 async def list_playlists(
     authorization: Optional[str] = Header(None),
     peerless_token: Optional[str] = Cookie(None),
@@ -453,17 +691,19 @@ async def list_playlists(
     user_id = get_current_user(authorization, peerless_token)
 
     if not user_id:
-        return []
+        return ORJSONResponse([])
 
     playlists = get_user_playlists(user_id)
-    return playlists
+    return ORJSONResponse(playlists)
 
 
-@app.post("/api/playlists/anonymous", response_model=List[PlaylistResponse])
+@app.post(
+    "/api/playlists/anonymous", responses={200: {"model": List[PlaylistResponse]}}
+)
 async def get_playlists_by_ids(data: AnonymousPlaylistsRequest):
     """Get playlists by IDs (for anonymous users with local storage)."""
     playlists = get_anonymous_playlists(data.playlist_ids)
-    return playlists
+    return ORJSONResponse(playlists)
 
 
 @app.post("/api/playlists", response_model=PlaylistResponse)
@@ -478,49 +718,40 @@ async def create_new_playlist(
     return playlist
 
 
-@app.get("/api/playlists/{playlist_id}", response_model=PlaylistResponse)
-async def get_playlist_by_id(playlist_id: str):
+@app.get("/api/playlists/{playlist_id}", responses={200: {"model": PlaylistResponse}})
+async def get_playlist_by_id(playlist_id: str, request: Request):
     """Get a specific playlist."""
     playlist = get_playlist(playlist_id)
     if not playlist:
         raise HTTPException(status_code=404, detail="Playlist not found")
-    return playlist
+    return etag_response(request, playlist, HTTP_NO_CACHE)
 
 
 @app.patch("/api/playlists/{playlist_id}", response_model=PlaylistResponse)
 async def update_playlist_by_id(playlist_id: str, data: PlaylistUpdate):
     """Update a playlist."""
-    playlist = get_playlist(playlist_id)
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-
     updated = update_playlist(
         playlist_id,
         name=data.name,
         description=data.description,
         cover_image=data.cover_image,
     )
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Playlist not found")
     return updated
 
 
 @app.delete("/api/playlists/{playlist_id}")
 async def delete_playlist_by_id(playlist_id: str):
     """Delete a playlist."""
-    playlist = get_playlist(playlist_id)
-    if not playlist:
+    if not delete_playlist(playlist_id):
         raise HTTPException(status_code=404, detail="Playlist not found")
-
-    delete_playlist(playlist_id)
     return {"success": True}
 
 
 @app.post("/api/playlists/{playlist_id}/tracks", response_model=PlaylistResponse)
 async def add_track_to_playlist_endpoint(playlist_id: str, track: TrackInput):
     """Add a track to a playlist."""
-    playlist = get_playlist(playlist_id)
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-
     updated = add_track_to_playlist(
         playlist_id,
         track.video_id,
@@ -529,6 +760,19 @@ async def add_track_to_playlist_endpoint(playlist_id: str, track: TrackInput):
         track.thumbnail,
         track.duration,
     )
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    return updated
+
+
+@app.post("/api/playlists/{playlist_id}/tracks/bulk", response_model=PlaylistResponse)
+async def add_tracks_to_playlist_endpoint(playlist_id: str, tracks: List[TrackInput]):
+    """Add several tracks to a playlist at once (e.g. when importing)."""
+    updated = add_tracks_to_playlist(
+        playlist_id, [track.model_dump() for track in tracks]
+    )
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Playlist not found")
     return updated
 
 
@@ -537,25 +781,33 @@ async def add_track_to_playlist_endpoint(playlist_id: str, track: TrackInput):
 )
 async def remove_track_from_playlist_endpoint(playlist_id: str, video_id: str):
     """Remove a track from a playlist."""
-    playlist = get_playlist(playlist_id)
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-
     updated = remove_track_from_playlist(playlist_id, video_id)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Playlist not found")
     return updated
 
 
 # ============== Failed Tracks Endpoints ==============
 
 
-@app.get("/api/failed-tracks", response_model=List[FailedTrackResponse])
-async def list_failed_tracks(status: Optional[str] = None):
+@app.get("/api/failed-tracks", responses={200: {"model": List[FailedTrackResponse]}})
+async def list_failed_tracks(
+    status: Optional[str] = None,
+    brief: bool = False,
+    after: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+):
     """
-    Get all failed tracks. Optionally filter by status ('pending' or 'resolved').
+    Get all failed tracks, newest first. Optionally filter by status ('pending' or 'resolved').
+    Pass brief=true to leave out thumbnail_url and error_message.
+    To page, pass limit and then the created_at/id of the last track as after/after_id.
     Access this endpoint from your personal laptop to see which tracks need manual upload.
     """
-    tracks = get_all_failed_tracks(status)
-    return tracks
+    tracks = get_all_failed_tracks(
+        status, brief=brief, after=after, after_id=after_id, limit=limit
+    )
+    return ORJSONResponse(tracks)
 
 
 @app.get("/api/failed-tracks/count")
@@ -604,4 +856,19 @@ async def delete_failed_track_endpoint(video_id: str):
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=BACKEND_PORT, reload=True)
+    # Several workers need REDIS_URL so the processing lock and response cache
+    # are shared; without it stay on one worker
+    default_workers = (os.cpu_count() or 1) * 2 + 1 if REDIS_URL else 1
+    workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+    # Workers must share the token signing key (see auth_service)
+    if workers > 1 and not os.getenv("JWT_PRIVATE_KEY"):
+        raise SystemExit("JWT_PRIVATE_KEY must be set to run more than one worker")
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=BACKEND_PORT,
+        workers=workers,
+        reload=os.getenv("ENV") == "dev",
+        loop="uvloop",
+        http="httptools",
+    )
@@ -32,6 +32,9 @@ USAGE:
     # Process ALL failed tracks automatically:
     python single_script.py --batch
 
+    # Batch mode runs 2 workers per pipeline stage by default:
+    python single_script.py --batch --concurrency 4
+
     # Process a single video by ID:
     python single_script.py VIDEO_ID
 
@@ -44,6 +47,9 @@ USAGE:
     # Skip marking as resolved on server:
     python single_script.py VIDEO_ID --no-resolve
 
+    # Upload without normalization (quick dev/test re-uploads):
+    python single_script.py VIDEO_ID --skip-normalize
+
 EXAMPLES:
     python single_script.py --batch
     python single_script.py dQw4w9WgXcQ
@@ -52,14 +58,20 @@ EXAMPLES:
 """
 
 import argparse
+import atexit
 import base64
+import collections
 import hashlib
 import os
+import queue
 import re
 import subprocess
 import sys
 import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional
 from urllib.parse import parse_qs, urlparse
 
@@ -69,6 +81,8 @@ import cloudinary.uploader
 import requests
 import yt_dlp
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -78,6 +92,56 @@ CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+# Set by --skip-normalize: upload audio as downloaded (dev/test re-uploads)
+SKIP_NORMALIZE = False
+
+# Batch mode runs download -> normalize -> upload as a pipeline with this many
+# worker threads per stage (which also caps concurrent YouTube downloads), and
+# at most PIPELINE_QUEUE_SIZE tracks waiting between stages
+BATCH_CONCURRENCY = 2
+PIPELINE_QUEUE_SIZE = 2
+
+# 320kbps MP3s run 5-15 MB; upload them in 6 MB chunks
+AUDIO_UPLOAD_CHUNK_SIZE = 6_000_000
+
+# Cloudinary uploads are tried this many times, waiting 1s, 2s, ... between
+UPLOAD_ATTEMPTS = 3
+
+# Thumbnails are stored as 500x500 covers
+THUMBNAIL_SIZE = (500, 500)
+# Responses bigger than this are not thumbnails; stop reading them
+MAX_THUMBNAIL_BYTES = 5_000_000
+
+# One pooled session for thumbnail and backend calls so connections (and TLS
+# handshakes) are reused across tracks. Transient failures are retried with
+# exponential backoff.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        raise_on_status=False,  # Hand back the last response once retries run out
+    ),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+
+# Lines of ffmpeg stderr kept for error messages
+FFMPEG_STDERR_LINES = 50
+
+# Spotify-like mastering chain, EXACT same audio filters as backend
+# youtube_service.py (see normalize_audio)
+AUDIO_FILTERS = (
+    "highpass=f=40,"
+    "equalizer=f=60:width_type=o:width=2:g=2,"
+    "equalizer=f=14000:width_type=o:width=2:g=1,"
+    "compand=attacks=0:points=-80/-80|-15/-15|-0/-0.5|20/-0.1:gain=1,"
+    "loudnorm=I=-14:TP=-1.0:LRA=11"
+)
 
 
 def check_requirements():
@@ -116,10 +180,44 @@ def check_requirements():
     print("✓ All requirements satisfied")
 
 
+_VIDEO_ID_RE = re.compile(r"[a-zA-Z0-9_-]{11}")
+
+
+def run_ffmpeg(cmd: list, timeout: Optional[float] = None) -> None:
+    """Run an ffmpeg command, keeping only the tail of its stderr.
+
+    Raises RuntimeError with the last stderr lines if ffmpeg fails or is
+    killed after `timeout` seconds.
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    watchdog = threading.Timer(timeout, kill) if timeout else None
+    if watchdog:
+        watchdog.start()
+    try:
+        tail = collections.deque(process.stderr, maxlen=FFMPEG_STDERR_LINES)
+        returncode = process.wait()
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        process.stderr.close()
+
+    if timed_out.is_set():
+        raise RuntimeError(f"ffmpeg timed out after {timeout}s")
+    if returncode:
+        stderr = b"".join(tail).decode("utf-8", "replace").strip()
+        raise RuntimeError(stderr or f"ffmpeg exited with status {returncode}")
+
+
 def extract_video_id(input_str: str) -> str:
     """Extract video ID from a YouTube URL or return as-is if already an ID."""
     # If it looks like a video ID (11 characters, alphanumeric with - and _)
-    if re.match(r"^[a-zA-Z0-9_-]{11}$", input_str):
+    if _VIDEO_ID_RE.fullmatch(input_str):
         return input_str
 
     # Try to parse as URL
@@ -150,10 +248,27 @@ def extract_video_id(input_str: str) -> str:
 def generate_track_id(title: str, artist: str) -> str:
     """Generate a consistent track ID from title and artist (same as backend)."""
     combined = f"{title.lower().strip()}_{artist.lower().strip()}"
+    return hashlib.blake2b(combined.encode(), digest_size=8).hexdigest()
+
+
+def generate_legacy_track_id(title: str, artist: str) -> str:
+    """MD5-based ID of tracks uploaded before the switch to BLAKE2b (same as backend)."""
+    combined = f"{title.lower().strip()}_{artist.lower().strip()}"
     return hashlib.md5(combined.encode()).hexdigest()[:16]
 
 
+_cookies_lock = threading.Lock()
+
+
 def _get_cookies_path() -> Optional[str]:
+    """Get YouTube cookies for yt-dlp, resolved once per run."""
+    # Lock so concurrent download workers don't both write the cookies file
+    with _cookies_lock:
+        return _load_cookies_path()
+
+
+@lru_cache(maxsize=1)
+def _load_cookies_path() -> Optional[str]:
     """Get YouTube cookies for yt-dlp (same as backend)."""
     cookies_path = os.getenv("YOUTUBE_COOKIES_PATH")
     if cookies_path and os.path.exists(cookies_path):
@@ -173,48 +288,77 @@ def _get_cookies_path() -> Optional[str]:
     return None
 
 
-def download_audio_ytdlp(video_id: str) -> tuple:
-    """Download using yt-dlp (same as backend)."""
-    print(f"📥 Downloading audio for video: {video_id}")
+class RateLimiter:
+    """Spaces calls at least `min_interval` seconds apart across all threads."""
 
-    temp_dir = tempfile.mkdtemp()
-    output_template = os.path.join(temp_dir, "%(id)s.%(ext)s")
-
-    ydl_opts = {
-        "format": "bestaudio/best",
-        "outtmpl": output_template,
-        "quiet": False,
-        "no_warnings": False,
-        "postprocessors": [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": "320",
-            }
-        ],
-    }
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
 
-    # Check for cookies file (same as backend)
-    cookies_path = _get_cookies_path()
-    if cookies_path:
-        ydl_opts["cookiefile"] = cookies_path
-        print(f"   Using cookies from: {cookies_path}")
+    def wait(self):
+        # Reserve the next free slot under the lock, then sleep outside it
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
 
-    url = f"https://www.youtube.com/watch?v={video_id}"
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=True)
+# Requests to YouTube (InnerTube player lookups and yt-dlp extractions) from
+# all workers go out at most this often, to stay clear of throttling
+YT_LIMITER = RateLimiter(min_interval=0.5)
+
+
+_ydl_local = threading.local()
+
+
+def _get_ydl() -> yt_dlp.YoutubeDL:
+    """This thread's YoutubeDL, set up once and reused for every track.
+
+    YoutubeDL is not thread-safe, so each download worker gets its own;
+    they are closed at exit.
+    """
+    ydl = getattr(_ydl_local, "ydl", None)
+    if ydl is None:
+        # Keep the original bestaudio stream (WebM/Opus or M4A): normalize_audio
+        # decodes and encodes to MP3 once, instead of yt-dlp encoding an MP3
+        # that normalize_audio then decodes and re-encodes
+        ydl_opts = {
+            "format": "bestaudio/best",
+            "outtmpl": "%(id)s.%(ext)s",
+            "quiet": False,
+            "no_warnings": False,
+        }
+
+        # Check for cookies file (same as backend)
+        cookies_path = _get_cookies_path()
+        if cookies_path:
+            ydl_opts["cookiefile"] = cookies_path
+            print(f"   Using cookies from: {cookies_path}")
+
+        ydl = _ydl_local.ydl = yt_dlp.YoutubeDL(ydl_opts)
+        atexit.register(ydl.close)
+    return ydl
 
-    # Find the downloaded file
-    audio_path = os.path.join(temp_dir, f"{video_id}.mp3")
-    if not os.path.exists(audio_path):
-        for file in os.listdir(temp_dir):
-            if file.endswith(".mp3"):
-                audio_path = os.path.join(temp_dir, file)
-                break
+
+def download_audio_ytdlp(video_id: str, work_dir: str) -> tuple:
+    """Download using yt-dlp (same as backend) into work_dir."""
+    print(f"📥 Downloading audio for video: {video_id}")
+
+    url = f"https://www.youtube.com/watch?v={video_id}"
+
+    ydl = _get_ydl()
+    # outtmpl is relative; point it at this track's directory
+    ydl.params["paths"] = {"home": work_dir}
+    YT_LIMITER.wait()
+    info = ydl.extract_info(url, download=True)
+    # Extension depends on the chosen format; no postprocessor renames it
+    audio_path = ydl.prepare_filename(info)
 
     if not os.path.exists(audio_path):
-        raise Exception(f"Failed to find downloaded audio file in {temp_dir}")
+        raise Exception(f"Failed to find downloaded audio file in {work_dir}")
 
     metadata = {
         "title": info.get("title", "Unknown Title"),
@@ -231,13 +375,20 @@ def download_audio_ytdlp(video_id: str) -> tuple:
     return audio_path, metadata
 
 
+@lru_cache(maxsize=1)
+def _get_innertube():
+    """ANDROID InnerTube client, created once and reused (with its connections)."""
+    import innertube
+
+    return innertube.InnerTube("ANDROID")
+
+
 def get_stream_url_innertube(video_id: str) -> Optional[dict]:
     """Get audio stream URL using InnerTube ANDROID client (same as backend)."""
     try:
-        import innertube
-
-        _android_client = innertube.InnerTube("ANDROID")
-        player = _android_client.player(video_id)
+        client = _get_innertube()
+        YT_LIMITER.wait()
+        player = client.player(video_id)
 
         # Check playability
         playability = player.get("playabilityStatus", {})
@@ -286,9 +437,9 @@ def get_stream_url_innertube(video_id: str) -> Optional[dict]:
         return None
 
 
-def download_audio(video_id: str) -> tuple:
+def download_audio(video_id: str, work_dir: str) -> tuple:
     """
-    Download audio with fallback chain (same as backend):
+    Download audio into work_dir with fallback chain (same as backend):
     1. InnerTube ANDROID (stream + ffmpeg)
     2. yt-dlp with cookies (download)
     """
@@ -297,16 +448,19 @@ def download_audio(video_id: str) -> tuple:
     stream_info = get_stream_url_innertube(video_id)
 
     if stream_info and stream_info.get("stream_url"):
-        print(f"[InnerTube] ✓ Got stream URL, downloading with FFmpeg...")
+        print(f"[InnerTube] ✓ Got stream URL, downloading and normalizing with FFmpeg...")
+        output_path = os.path.join(work_dir, f"{video_id}.mp3")
         try:
-            temp_dir = tempfile.mkdtemp()
-            output_path = os.path.join(temp_dir, f"{video_id}.mp3")
-
+            # Mastering is applied in the same pass as the download, so the
+            # stream is encoded to MP3 once and normalize_audio is skipped
             cmd = [
                 "ffmpeg",
+                "-loglevel",
+                "error",
                 "-i",
                 stream_info["stream_url"],
                 "-vn",
+                *([] if SKIP_NORMALIZE else ["-af", AUDIO_FILTERS]),
                 "-acodec",
                 "libmp3lame",
                 "-ab",
@@ -317,24 +471,27 @@ def download_audio(video_id: str) -> tuple:
                 output_path,
             ]
 
-            subprocess.run(cmd, check=True, capture_output=True, timeout=300)
+            run_ffmpeg(cmd, timeout=300)
 
             metadata = {
                 "title": stream_info["title"],
                 "artist": stream_info["artist"],
                 "thumbnail": stream_info["thumbnail"],
                 "duration": stream_info["duration"],
+                "normalized": not SKIP_NORMALIZE,
             }
 
             print(f"[InnerTube] ✓ Download complete")
             return output_path, metadata
         except Exception as e:
             print(f"[InnerTube] ✗ FFmpeg failed: {e}")
-            # Fall through to yt-dlp
+            # Fall through to yt-dlp, dropping any partial output
+            if os.path.exists(output_path):
+                os.remove(output_path)
 
     # Fallback to yt-dlp
     print(f"[yt-dlp] Falling back to yt-dlp...")
-    return download_audio_ytdlp(video_id)
+    return download_audio_ytdlp(video_id, work_dir)
 
 
 def normalize_audio(input_path: str) -> str:
@@ -348,25 +505,25 @@ def normalize_audio(input_path: str) -> str:
     - compand: Gentle compression for dynamic range control
     - loudnorm: Loudness normalization to -14 LUFS (Spotify standard)
     """
-    print("🎵 Normalizing audio (Spotify-like mastering)...")
+    if SKIP_NORMALIZE:
+        print("⏭️  Skipping normalization (--skip-normalize)")
+        return input_path
 
-    output_path = input_path.replace(".mp3", "_normalized.mp3")
+    print("🎵 Normalizing audio (Spotify-like mastering)...")
 
-    # EXACT same audio filters as backend youtube_service.py
-    audio_filters = (
-        "highpass=f=40,"
-        "equalizer=f=60:width_type=o:width=2:g=2,"
-        "equalizer=f=14000:width_type=o:width=2:g=1,"
-        "compand=attacks=0:points=-80/-80|-15/-15|-0/-0.5|20/-0.1:gain=1,"
-        "loudnorm=I=-14:TP=-1.0:LRA=11"
-    )
+    # Input may be MP3 (InnerTube path) or the raw yt-dlp download
+    output_path = os.path.splitext(input_path)[0] + "_normalized.mp3"
 
     cmd = [
         "ffmpeg",
+        "-loglevel",
+        "error",  # Only errors on stderr, no banner or progress
         "-i",
         input_path,
+        "-vn",  # Drop embedded cover art instead of re-encoding it
         "-af",
-        audio_filters,
+        AUDIO_FILTERS,
+        # Always needed: loudnorm (already single-pass) outputs 192kHz
         "-ar",
         "48000",  # 48kHz sample rate
         "-b:a",
@@ -376,77 +533,165 @@ def normalize_audio(input_path: str) -> str:
     ]
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        run_ffmpeg(cmd)
         os.remove(input_path)  # Clean up original
         print("✓ Audio normalized (same processing as backend)")
         return output_path
-    except subprocess.CalledProcessError as e:
-        print(f"⚠ Normalization failed, using original file: {e.stderr}")
+    except RuntimeError as e:
+        print(f"⚠ Normalization failed, using original file: {e}")
         return input_path
 
 
-def download_thumbnail(url: str, video_id: str) -> str:
-    """Download thumbnail image."""
+def resize_thumbnail(path: str) -> None:
+    """Crop/resize a thumbnail to 500x500 in place, as Cloudinary's fill crop would.
+
+    A 1280x720 YouTube thumbnail shrinks several-fold, so less goes over the
+    wire. Skipped if Pillow is not installed.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return
+
+    try:
+        with Image.open(path) as img:
+            resized = ImageOps.fit(
+                img.convert("RGB"), THUMBNAIL_SIZE, Image.Resampling.LANCZOS
+            )
+        resized.save(path, "JPEG", quality=90, optimize=True)
+    except Exception as e:
+        print(f"⚠ Could not resize thumbnail locally, uploading original: {e}")
+
+
+def _probe_thumbnail(url: str) -> bool:
+    """HEAD a thumbnail URL; True if it looks like a real image."""
+    try:
+        response = SESSION.head(url, timeout=(3, 10), allow_redirects=True)
+        # Some hosts omit Content-Length on HEAD; the GET checks the size then
+        length = response.headers.get("Content-Length")
+        return response.status_code == 200 and (length is None or int(length) > 1000)
+    except Exception:
+        # Includes a malformed Content-Length: skip this candidate
+        return False
+
+
+def _fetch_thumbnail(url: str, path: str) -> bool:
+    """Stream an image to `path`. False if missing, too small or too large."""
+    try:
+        with SESSION.get(url, stream=True, timeout=(3, 15)) as response:
+            if response.status_code != 200:
+                return False
+            length = int(response.headers.get("Content-Length", 0))
+            if 0 < length < 1000 or length > MAX_THUMBNAIL_BYTES:
+                return False
+
+            total = 0
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(65536):
+                    total += len(chunk)
+                    if total > MAX_THUMBNAIL_BYTES:
+                        return False
+                    f.write(chunk)
+            return total > 1000
+    except Exception:
+        return False
+
+
+def download_thumbnail(url: str, video_id: str, work_dir: str) -> str:
+    """Download thumbnail image into work_dir."""
     print("🖼️  Downloading thumbnail...")
 
-    temp_dir = tempfile.mkdtemp()
-    thumbnail_path = os.path.join(temp_dir, f"{video_id}_thumb.jpg")
+    thumbnail_path = os.path.join(work_dir, f"{video_id}_thumb.jpg")
 
     # Try multiple thumbnail URLs (same priority as backend)
-    urls_to_try = [
-        url,
-        f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg",
-        f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
-        f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg",
-    ]
+    urls_to_try = list(
+        dict.fromkeys(
+            [
+                url,
+                f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg",
+                f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+                f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg",
+            ]
+        )
+    )
 
-    for thumb_url in urls_to_try:
-        try:
-            response = requests.get(thumb_url, timeout=30)
-            if response.status_code == 200 and len(response.content) > 1000:
-                with open(thumbnail_path, "wb") as f:
-                    f.write(response.content)
-                print(f"✓ Thumbnail downloaded from: {thumb_url[:50]}...")
-                return thumbnail_path
-        except Exception:
-            continue
+    # Probe every candidate at once rather than waiting for each miss (e.g. a
+    # 404 maxresdefault) in turn, then download the best one that exists
+    with ThreadPoolExecutor(max_workers=len(urls_to_try)) as executor:
+        available = list(executor.map(_probe_thumbnail, urls_to_try))
+
+    for thumb_url, ok in zip(urls_to_try, available):
+        if ok and _fetch_thumbnail(thumb_url, thumbnail_path):
+            print(f"✓ Thumbnail downloaded from: {thumb_url[:50]}...")
+            resize_thumbnail(thumbnail_path)
+            return thumbnail_path
 
     raise Exception("Failed to download thumbnail from any source")
 
 
+def _is_transient_cloudinary_error(error: Exception) -> bool:
+    # Plain Error covers socket/HTTP failures and unparseable 502/504 bodies;
+    # subclasses like BadRequest or AuthorizationRequired will fail again
+    return type(error) is cloudinary.exceptions.Error or isinstance(
+        error, (cloudinary.exceptions.RateLimited, cloudinary.exceptions.GeneralError)
+    )
+
+
+def with_retries(func, *args, **kwargs):
+    """Call a Cloudinary upload, retrying transient errors with exponential backoff."""
+    for attempt in range(UPLOAD_ATTEMPTS):
+        try:
+            return func(*args, **kwargs)
+        except cloudinary.exceptions.Error as e:
+            if attempt == UPLOAD_ATTEMPTS - 1 or not _is_transient_cloudinary_error(e):
+                raise
+            delay = 2**attempt
+            print(f"⚠ Cloudinary upload failed ({e}), retrying in {delay}s...")
+            time.sleep(delay)
+
+
 def upload_to_cloudinary(
     audio_path: str, thumbnail_path: str, track_id: str, title: str, artist: str
 ) -> dict:
     """Upload audio and thumbnail to Cloudinary (same structure as backend)."""
     print("☁️  Uploading to Cloudinary...")
-
-    # Upload audio (same as backend cloudinary_service.py)
-    print("   Uploading audio...")
+    print("   Uploading audio and thumbnail...")
     context = {"title": title, "artist": artist}
 
-    audio_result = cloudinary.uploader.upload(
-        audio_path,
-        resource_type="video",  # Cloudinary uses 'video' for audio files
-        public_id=f"peerless_music/audio/{track_id}",
-        overwrite=True,
-        format="mp3",
-        context=context,
-    )
+    # The two uploads are independent, so run them side by side
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Upload audio (same as backend cloudinary_service.py). Sent in
+        # chunks so a dropped connection costs one chunk, not the whole file
+        audio_future = executor.submit(
+            with_retries,
+            cloudinary.uploader.upload_large,
+            audio_path,
+            resource_type="video",  # Cloudinary uses 'video' for audio files
+            public_id=f"peerless_music/audio/{track_id}",
+            overwrite=True,
+            format="mp3",
+            context=context,
+            chunk_size=AUDIO_UPLOAD_CHUNK_SIZE,
+        )
+        # Upload thumbnail (same as backend cloudinary_service.py). Already
+        # resized locally; the transformation is a no-op safety net then
+        thumb_future = executor.submit(
+            with_retries,
+            cloudinary.uploader.upload,
+            thumbnail_path,
+            resource_type="image",
+            public_id=f"peerless_music/thumbnails/{track_id}",
+            overwrite=True,
+            transformation=[
+                {"width": 500, "height": 500, "crop": "fill"},
+                {"quality": "auto:best"},
+            ],
+        )
+        audio_result = audio_future.result()
+        thumb_result = thumb_future.result()
+
     audio_url = audio_result.get("secure_url")
     print(f"✓ Audio uploaded: {audio_url[:60]}...")
-
-    # Upload thumbnail (same as backend cloudinary_service.py)
-    print("   Uploading thumbnail...")
-    thumb_result = cloudinary.uploader.upload(
-        thumbnail_path,
-        resource_type="image",
-        public_id=f"peerless_music/thumbnails/{track_id}",
-        overwrite=True,
-        transformation=[
-            {"width": 500, "height": 500, "crop": "fill"},
-            {"quality": "auto:best"},
-        ],
-    )
     thumbnail_url = thumb_result.get("secure_url")
     print(f"✓ Thumbnail uploaded: {thumbnail_url[:60]}...")
 
@@ -464,7 +709,7 @@ def mark_as_resolved(video_id: str, track_id: str) -> bool:
 
     try:
         url = f"{BACKEND_URL}/api/failed-tracks/{video_id}/resolve"
-        response = requests.post(url, json={"track_id": track_id}, timeout=30)
+        response = SESSION.post(url, json={"track_id": track_id}, timeout=30)
 
         if response.status_code == 200:
             print("✓ Track marked as resolved on server")
@@ -493,7 +738,7 @@ def fetch_failed_tracks() -> list:
 
     try:
         url = f"{BACKEND_URL}/api/failed-tracks?status=pending"
-        response = requests.get(url, timeout=30)
+        response = SESSION.get(url, timeout=30)
 
         if response.status_code == 200:
             tracks = response.json()
@@ -511,95 +756,224 @@ def fetch_failed_tracks() -> list:
         return []
 
 
-def cleanup_files(*paths):
-    """Clean up temporary files."""
-    for path in paths:
+def is_already_uploaded(track_id: str) -> bool:
+    """Check whether Cloudinary already has audio for this track_id."""
+    try:
+        cloudinary.api.resource(
+            f"peerless_music/audio/{track_id}", resource_type="video"
+        )
+        return True
+    except cloudinary.exceptions.NotFound:
+        return False
+    except Exception as e:
+        print(f"⚠ Could not check Cloudinary for {track_id}: {e}")
+        return False
+
+
+def find_uploaded_tracks(track_ids: list) -> Optional[set]:
+    """Return which track_ids already have audio on Cloudinary.
+
+    Checks up to 100 IDs per Admin API call. None if the lookup failed.
+    """
+    uploaded = set()
+    for start in range(0, len(track_ids), 100):
+        public_ids = [f"peerless_music/audio/{t}" for t in track_ids[start : start + 100]]
         try:
-            if path and os.path.exists(path):
-                os.remove(path)
-                # Try to remove parent temp directory if empty
-                parent = os.path.dirname(path)
-                if parent and os.path.exists(parent) and not os.listdir(parent):
-                    os.rmdir(parent)
-        except Exception:
-            pass
+            result = cloudinary.api.resources_by_ids(
+                public_ids, resource_type="video", max_results=100
+            )
+        except Exception as e:
+            print(f"⚠ Could not check Cloudinary for existing tracks: {e}")
+            return None
+        for resource in result.get("resources", []):
+            uploaded.add(resource["public_id"].removeprefix("peerless_music/audio/"))
+    return uploaded
+
+
+def download_stage(job: dict) -> dict:
+    """Stage 1: download the audio and settle the track's title/artist."""
+    # When title/artist are known up front, a previous (partial) run may have
+    # uploaded the track already; then only the resolve step is left
+    if "uploaded_track_id" not in job and job.get("lookup"):
+        # Like the backend's find_existing_audio, also accept the legacy ID
+        for track_id in (
+            generate_track_id(*job["lookup"]),
+            generate_legacy_track_id(*job["lookup"]),
+        ):
+            if is_already_uploaded(track_id):
+                job["uploaded_track_id"] = track_id
+                break
+    if "uploaded_track_id" in job:
+        print(f"⏭️  Already on Cloudinary as {job['uploaded_track_id']}, skipping download")
+        return job
 
+    # Every file for the track lives in one temp dir, removed by finish_track
+    # (or when the object is garbage collected / at exit if that never runs)
+    job["work_dir"] = tempfile.TemporaryDirectory(prefix="peerless_")
 
-def process_single_track(
-    video_id: str,
-    title_override: str = None,
-    artist_override: str = None,
-    no_resolve: bool = False,
-) -> bool:
-    """Process a single track. Returns True on success, False on failure."""
-    audio_path = None
-    thumbnail_path = None
+    # Step 1: Download audio (same method as backend)
+    job["audio_path"], metadata = download_audio(
+        job["video_id"], job["work_dir"].name
+    )
 
-    try:
-        # Step 1: Download audio (same method as backend)
-        audio_path, metadata = download_audio(video_id)
+    # Override metadata if provided
+    job["title"] = job.get("title") or metadata["title"]
+    job["artist"] = job.get("artist") or metadata["artist"]
+    job["thumbnail"] = metadata["thumbnail"]
+    job["normalized"] = metadata.get("normalized", False)
 
-        # Override metadata if provided
-        title = title_override or metadata["title"]
-        artist = artist_override or metadata["artist"]
-        thumbnail_url = metadata["thumbnail"]
-        duration = metadata["duration"]
+    print()
+    print(f"📝 Track Info:")
+    print(f"   Title: {job['title']}")
+    print(f"   Artist: {job['artist']}")
+    print(f"   Duration: {metadata['duration']}s")
+    print()
+    return job
 
-        print()
-        print(f"📝 Track Info:")
-        print(f"   Title: {title}")
-        print(f"   Artist: {artist}")
-        print(f"   Duration: {duration}s")
-        print()
 
-        # Step 2: Normalize audio (EXACT same as backend)
-        audio_path = normalize_audio(audio_path)
-        print()
+def process_stage(job: dict) -> dict:
+    """Stage 2: normalize the audio and fetch the thumbnail."""
+    if "uploaded_track_id" in job:
+        return job
 
-        # Step 3: Download thumbnail
-        thumbnail_path = download_thumbnail(thumbnail_url, video_id)
+    # Step 2: Normalize audio (EXACT same as backend), unless the download
+    # already applied the same filters
+    if not job["normalized"]:
+        job["audio_path"] = normalize_audio(job["audio_path"])
         print()
 
-        # Step 4: Generate track ID (same as backend)
-        track_id = generate_track_id(title, artist)
-        print(f"🔑 Track ID: {track_id}")
-        print()
+    # Step 3: Download thumbnail
+    job["thumbnail_path"] = download_thumbnail(
+        job["thumbnail"], job["video_id"], job["work_dir"].name
+    )
+    print()
+    return job
 
-        # Step 5: Upload to Cloudinary (same structure as backend)
-        upload_result = upload_to_cloudinary(
-            audio_path, thumbnail_path, track_id, title, artist
-        )
-        print()
 
-        # Step 6: Mark as resolved on server
-        if not no_resolve:
-            mark_as_resolved(video_id, track_id)
-        print()
+def upload_stage(job: dict) -> dict:
+    """Stage 3: upload to Cloudinary and mark the track as resolved."""
+    if "uploaded_track_id" in job:
+        if not job.get("no_resolve"):
+            mark_as_resolved(job["video_id"], job["uploaded_track_id"])
+        return job
 
-        # Success summary
-        print("=" * 60)
-        print(f"✅ SUCCESS! Track uploaded: {title}")
-        print("=" * 60)
-        print(f"   Track ID:      {upload_result['track_id']}")
-        print(f"   Audio URL:     {upload_result['audio_url'][:50]}...")
-        print(f"   Thumbnail URL: {upload_result['thumbnail_url'][:50]}...")
-        print()
+    title, artist = job["title"], job["artist"]
 
-        return True
+    # Step 4: Generate track ID (same as backend)
+    track_id = generate_track_id(title, artist)
+    print(f"🔑 Track ID: {track_id}")
+    print()
 
-    except Exception as e:
+    # Step 5: Upload to Cloudinary (same structure as backend)
+    upload_result = upload_to_cloudinary(
+        job["audio_path"], job["thumbnail_path"], track_id, title, artist
+    )
+    print()
+
+    # Step 6: Mark as resolved on server
+    if not job.get("no_resolve"):
+        mark_as_resolved(job["video_id"], track_id)
+    print()
+
+    # Success summary
+    print("=" * 60)
+    print(f"✅ SUCCESS! Track uploaded: {title}")
+    print("=" * 60)
+    print(f"   Track ID:      {upload_result['track_id']}")
+    print(f"   Audio URL:     {upload_result['audio_url'][:50]}...")
+    print(f"   Thumbnail URL: {upload_result['thumbnail_url'][:50]}...")
+    print()
+    return job
+
+
+def finish_track(job: dict, error: Optional[Exception] = None) -> None:
+    """Record a track's outcome, report any error and remove its temp dir."""
+    job["success"] = error is None
+    if error is not None:
         print()
         print("=" * 60)
-        print(f"❌ ERROR processing {video_id}: {e}")
+        print(f"❌ ERROR processing {job['video_id']}: {error}")
         print("=" * 60)
-        return False
+    if "work_dir" in job:
+        job["work_dir"].cleanup()
 
-    finally:
-        # Cleanup
-        cleanup_files(audio_path, thumbnail_path)
 
+def process_single_track(
+    video_id: str,
+    title_override: str = None,
+    artist_override: str = None,
+    no_resolve: bool = False,
+) -> bool:
+    """Process a single track. Returns True on success, False on failure."""
+    job = {
+        "video_id": video_id,
+        "title": title_override,
+        "artist": artist_override,
+        "no_resolve": no_resolve,
+    }
+    if title_override and artist_override:
+        job["lookup"] = (title_override, artist_override)
+    try:
+        for stage in (download_stage, process_stage, upload_stage):
+            job = stage(job)
+    except Exception as e:
+        finish_track(job, e)
+    else:
+        finish_track(job)
+    return job["success"]
+
+
+_END = object()
 
-def process_batch():
+
+def run_track_pipeline(jobs: list, stages: list) -> None:
+    """Run jobs through `stages`, a list of (stage_function, worker_count).
+
+    Stages are linked by small bounded queues, so one track can download
+    while another is normalized and a third uploads. A slow stage makes the
+    ones before it wait instead of piling up temp files. Every job ends with
+    finish_track, which sets job["success"].
+    """
+    queues = [queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in stages]
+
+    def worker(index: int):
+        stage = stages[index][0]
+        is_last = index == len(stages) - 1
+        while (job := queues[index].get()) is not _END:
+            try:
+                job = stage(job)
+            except Exception as e:
+                finish_track(job, e)
+                continue
+            if is_last:
+                finish_track(job)
+            else:
+                queues[index + 1].put(job)
+
+    threads = []
+    for index, (_, worker_count) in enumerate(stages):
+        threads.append(
+            [
+                threading.Thread(target=worker, args=(index,), daemon=True)
+                for _ in range(worker_count)
+            ]
+        )
+        for thread in threads[-1]:
+            thread.start()
+
+    for job in jobs:
+        queues[0].put(job)
+
+    # Once a stage's workers have all exited, everything they produced is
+    # queued for the next stage, so its end markers go in behind it
+    for index, stage_threads in enumerate(threads):
+        for _ in stage_threads:
+            queues[index].put(_END)
+        for thread in stage_threads:
+            thread.join()
+
+
+def process_batch(concurrency: int = BATCH_CONCURRENCY):
     """Fetch and process all failed tracks automatically."""
     print("=" * 60)
     print("🔄 BATCH MODE - Processing all failed tracks")
@@ -622,44 +996,73 @@ def process_batch():
         )
     print()
 
-    # Process each track
-    success_count = 0
-    fail_count = 0
-    results = []
-
-    for i, track in enumerate(failed_tracks, 1):
-        video_id = track["video_id"]
-        video_title = track.get("video_title", "Unknown")
-        artist = track.get("artist", "Unknown")
+    # Let each track fetch fresh metadata rather than the stored title/artist;
+    # the stored ones are only used to spot tracks that are already uploaded
+    jobs = [
+        {
+            "video_id": track["video_id"],
+            "position": i,
+            "lookup": (track["video_title"], track["artist"]),
+        }
+        for i, track in enumerate(failed_tracks, 1)
+    ]
 
+    # Find tracks a previous run already uploaded with one call per 100
+    # IDs, instead of a lookup per track inside the pipeline. Tracks uploaded
+    # before the ID change are stored under their legacy MD5 ID.
+    candidates = [
+        (generate_track_id(*job["lookup"]), generate_legacy_track_id(*job["lookup"]))
+        for job in jobs
+    ]
+    uploaded = find_uploaded_tracks([track_id for ids in candidates for track_id in ids])
+    if uploaded is not None:
+        found = 0
+        for job, ids in zip(jobs, candidates):
+            del job["lookup"]
+            track_id = next((track_id for track_id in ids if track_id in uploaded), None)
+            if track_id:
+                job["uploaded_track_id"] = track_id
+                found += 1
+        print(f"✓ {found} track(s) already on Cloudinary, will only resolve")
+
+    def start_stage(job: dict) -> dict:
+        track = failed_tracks[job["position"] - 1]
         print()
         print("=" * 60)
-        print(f"📀 Processing track {i}/{len(failed_tracks)}")
-        print(f"   Video ID: {video_id}")
-        print(f"   Title: {video_title}")
-        print(f"   Artist: {artist}")
+        print(f"📀 Processing track {job['position']}/{len(failed_tracks)}")
+        print(f"   Video ID: {track['video_id']}")
+        print(f"   Title: {track.get('video_title', 'Unknown')}")
+        print(f"   Artist: {track.get('artist', 'Unknown')}")
         print("=" * 60)
         print()
+        return download_stage(job)
+
+    # Downloads are network-bound, normalizing is ffmpeg CPU work and
+    # uploads are network-bound again, so overlapping the stages keeps both
+    # busy (output from different tracks interleaves)
+    print(f"⚙️  Running {concurrency} worker(s) per stage")
+    run_track_pipeline(
+        jobs,
+        [
+            (start_stage, concurrency),
+            (process_stage, concurrency),
+            (upload_stage, concurrency),
+        ],
+    )
 
-        # Use the stored metadata from the failed track if available
-        success = process_single_track(
-            video_id=video_id,
-            title_override=None,  # Let it fetch fresh metadata
-            artist_override=None,
-            no_resolve=False,
-        )
+    # Tally results in the original track order
+    success_count = 0
+    fail_count = 0
+    results = []
 
-        if success:
+    for track, job in zip(failed_tracks, jobs):
+        video_title = track.get("video_title", "Unknown")
+        if job["success"]:
             success_count += 1
-            results.append((video_id, video_title, "✅ Success"))
+            results.append((track["video_id"], video_title, "✅ Success"))
         else:
             fail_count += 1
-            results.append((video_id, video_title, "❌ Failed"))
-
-        # Small delay between tracks to be nice to YouTube
-        if i < len(failed_tracks):
-            print("⏳ Waiting 3 seconds before next track...")
-            time.sleep(3)
+            results.append((track["video_id"], video_title, "❌ Failed"))
 
     # Final summary
     print()
@@ -681,6 +1084,8 @@ def process_batch():
 
 
 def main():
+    global BACKEND_URL, SKIP_NORMALIZE
+
     parser = argparse.ArgumentParser(
         description="Upload YouTube tracks to Cloudinary for the Peerless Music app",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -715,13 +1120,24 @@ Examples:
     parser.add_argument(
         "--backend-url", help=f"Backend server URL (default: {BACKEND_URL})"
     )
+    parser.add_argument(
+        "--skip-normalize",
+        action="store_true",
+        help="Upload audio without the mastering/normalization pass (dev/test)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help=f"Workers per pipeline stage in batch mode (default: {BATCH_CONCURRENCY})",
+    )
 
     args = parser.parse_args()
 
     # Override backend URL if provided
-    global BACKEND_URL
     if args.backend_url:
         BACKEND_URL = args.backend_url
+    SKIP_NORMALIZE = args.skip_normalize
 
     # Validate arguments
     if not args.batch and not args.video:
@@ -743,7 +1159,7 @@ Examples:
 
     if args.batch:
         # Batch mode - process all failed tracks
-        process_batch()
+        process_batch(max(1, args.concurrency))
     else:
         # Single track mode
         video_id = extract_video_id(args.video)
@@ -2,132 +2,331 @@
 YouTube service using InnerTube library (primary) with yt-dlp fallback.
 """
 
+import asyncio
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import sys
 import base64
-import subprocess
+import hashlib
+import json
+import math
 import tempfile
-from typing import Optional
+import threading
+import uuid
+from functools import lru_cache
+from itertools import islice
+from typing import Iterator, Optional
+
+import httpx
+import orjson
+from cache import TTLCache
+from config import LOUDNORM_TWO_PASS
+from innertube import api as innertube_api
+from innertube.config import config as innertube_config
+
+
+# Log records are handed to a background thread for formatting and writing,
+# so concurrent downloads don't contend on stdout. Success messages are
+# DEBUG; only fallbacks and failures show at the default INFO level.
+log = logging.getLogger(__name__)
+if not log.handlers:
+    _log_queue = queue.SimpleQueue()
+    _log_output = logging.StreamHandler(sys.stdout)
+    _log_output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _log_listener = logging.handlers.QueueListener(_log_queue, _log_output)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    log.addHandler(logging.handlers.QueueHandler(_log_queue))
+    log.setLevel(os.getenv("YOUTUBE_LOG_LEVEL", "INFO").upper())
+    log.propagate = False
+
+# InnerTube requests are POSTed with the WEB/ANDROID/IOS client contexts over
+# one shared connection pool owned by the app's event loop. Connections are
+# kept alive and use HTTP/2, so search and player calls multiplex over one
+# TLS session.
+INNERTUBE_POOL_SIZE = 32
+_innertube_limits = httpx.Limits(
+    max_connections=INNERTUBE_POOL_SIZE,
+    max_keepalive_connections=INNERTUBE_POOL_SIZE,
+)
+_async_http: Optional[httpx.AsyncClient] = None
+
+# Stream URLs are signed for ~6 hours; keep player results a little less.
+# Searches are cached briefly to absorb repeated identical queries.
+_stream_cache = TTLCache(maxsize=1024, ttl=5 * 3600)
+_search_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def _get_async_http() -> httpx.AsyncClient:
+    global _async_http
+    if _async_http is None:
+        _async_http = httpx.AsyncClient(
+            base_url=innertube_config.base_url,
+            http2=True,
+            limits=_innertube_limits,
+            timeout=15,
+        )
+    return _async_http
+
 
-import innertube
-import yt_dlp
+async def close_async_http() -> None:
+    """Close the async InnerTube connection pool (on app shutdown)."""
+    global _async_http
+    if _async_http is not None:
+        await _async_http.aclose()
+        _async_http = None
 
 
-# Initialize InnerTube clients
-_web_client = innertube.InnerTube("WEB")
-_android_client = innertube.InnerTube("ANDROID")
+def _request_template(client_name: str) -> tuple[dict, dict, bytes]:
+    """Query params, headers and serialized context body for an InnerTube client.
 
+    The context never changes, so it is encoded once and each request only
+    splices its own fields into the JSON object.
+    """
+    context = innertube_api.get_context(client_name)
+    headers = {**context.headers(), "Content-Type": "application/json"}
+    return context.params(), headers, orjson.dumps(innertube_api.contextualise(context, {}))
+
+
+_WEB_REQUEST = _request_template("WEB")
+_ANDROID_REQUEST = _request_template("ANDROID")
+_IOS_REQUEST = _request_template("IOS")
+
+# Player lookups try these clients in order (both return direct stream URLs).
+# A client whose requests fail PLAYER_FAILURE_LIMIT times in a row (403s,
+# rate limits, ...) is moved to the back so the next one is tried first.
+PLAYER_FAILURE_LIMIT = 3
+_player_clients = [("ANDROID", _ANDROID_REQUEST), ("IOS", _IOS_REQUEST)]
+_player_failures = dict.fromkeys((name for name, _ in _player_clients), 0)
+_player_lock = threading.Lock()
+
+
+def _player_order() -> list[tuple[str, tuple[dict, dict, bytes]]]:
+    with _player_lock:
+        return list(_player_clients)
+
+
+def _record_player_result(name: str, ok: bool) -> None:
+    with _player_lock:
+        if ok:
+            _player_failures[name] = 0
+            return
+        _player_failures[name] += 1
+        if _player_failures[name] < PLAYER_FAILURE_LIMIT:
+            return
+        _player_failures[name] = 0
+        entry = next(entry for entry in _player_clients if entry[0] == name)
+        _player_clients.remove(entry)
+        _player_clients.append(entry)
+    log.warning("InnerTube %s player keeps failing; trying it last", name)
+
+
+async def _innertube_call(template: tuple[dict, dict, bytes], endpoint: str, body: dict) -> dict:
+    """POST to an InnerTube endpoint with a client's request template, without blocking."""
+    params, headers, context_json = template
+    # '{"context":{...}}' + '{"query":...}' -> '{"context":{...},"query":...}'
+    payload = context_json[:-1] + b"," + orjson.dumps(body)[1:]
+    response = await _get_async_http().post(
+        endpoint, params=params, content=payload, headers=headers
+    )
+    response.raise_for_status()
+    # Player responses run to hundreds of KB; orjson parses them several
+    # times faster than the stdlib json behind response.json()
+    return orjson.loads(response.content)
 
 
-def search_youtube(query: str, max_results: int = 10) -> list[dict]:
-    """Search using InnerTube WEB client."""
+async def search_youtube_async(query: str, max_results: int = 10) -> list[dict]:
+    """Search using the InnerTube WEB client; safe to fan out with asyncio.gather."""
+    cached = _search_cache.get((query, max_results))
+    if cached is not None:
+        return cached
     try:
-        data = _web_client.search(query=query)
-        
-        contents = (
-            data.get("contents", {})
-            .get("twoColumnSearchResultsRenderer", {})
-            .get("primaryContents", {})
-            .get("sectionListRenderer", {})
-            .get("contents", [])
-        )
-        
-        tracks = []
-        for section in contents:
-            items = section.get("itemSectionRenderer", {}).get("contents", [])
-            
-            for item in items:
-                if len(tracks) >= max_results:
-                    break
-                    
-                video = item.get("videoRenderer")
-                if not video:
-                    continue
-                
-                try:
-                    video_id = video["videoId"]
-                    title = video["title"]["runs"][0]["text"]
-                    channel = video.get("ownerText", {}).get("runs", [{}])[0].get("text", "Unknown Artist")
-                    
-                    # Get best thumbnail
-                    thumbnails = video.get("thumbnail", {}).get("thumbnails", [])
-                    thumbnail = thumbnails[-1]["url"] if thumbnails else f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
-                    
-                    # Parse duration
-                    duration = 0
-                    length_text = video.get("lengthText", {}).get("simpleText", "")
-                    if length_text:
-                        parts = length_text.split(":")
-                        if len(parts) == 2:
-                            duration = int(parts[0]) * 60 + int(parts[1])
-                        elif len(parts) == 3:
-                            duration = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                    
-                    tracks.append({
-                        "video_id": video_id,
-                        "title": title,
-                        "artist": channel,
-                        "thumbnail": thumbnail,
-                        "duration": duration,
-                        "url": f"https://www.youtube.com/watch?v={video_id}",
-                    })
-                except (KeyError, IndexError, ValueError):
-                    continue
-        
-        return tracks
+        data = await _innertube_call(_WEB_REQUEST, "search", {"query": query})
+        return _cache_search(query, max_results, _parse_search_results(data, max_results))
     except Exception as e:
-        print(f"InnerTube search error: {e}")
+        log.warning("InnerTube search error: %s", e)
         return []
 
 
-def get_stream_url_innertube(video_id: str) -> Optional[dict]:
-    """Get audio stream URL using InnerTube ANDROID client."""
+def _cache_search(query: str, max_results: int, tracks: list[dict]) -> list[dict]:
+    # Empty results are not cached so a transient failure is retried
+    if tracks:
+        _search_cache.set((query, max_results), tracks)
+    return tracks
+
+
+# Where the result sections sit in a WEB search response
+_SEARCH_PATH = (
+    "contents",
+    "twoColumnSearchResultsRenderer",
+    "primaryContents",
+    "sectionListRenderer",
+    "contents",
+)
+
+
+def _parse_search_results(data: dict, max_results: int) -> list[dict]:
+    """Extract up to `max_results` track dicts from a WEB search response."""
+    return list(islice(_iter_search_results(data), max_results))
+
+
+def _iter_search_results(data: dict) -> Iterator[dict]:
+    """Lazily parse the videos in a WEB search response, in order."""
+    contents = data
     try:
-        player = _android_client.player(video_id)
-        
-        # Check playability
-        playability = player.get("playabilityStatus", {})
-        if playability.get("status") != "OK":
-            reason = playability.get("reason", "Unknown error")
-            print(f"InnerTube playability error: {reason}")
-            return None
-        
-        # Get video details
-        video_details = player.get("videoDetails", {})
-        
-        # Get streaming data
-        streaming = player.get("streamingData", {})
-        formats = streaming.get("adaptiveFormats", [])
-        
-        # Find best audio format
-        audio_formats = [f for f in formats if f.get("mimeType", "").startswith("audio/")]
-        if not audio_formats:
-            print("No audio formats found")
-            return None
-        
-        # Sort by bitrate (highest first)
-        audio_formats.sort(key=lambda x: x.get("bitrate", 0), reverse=True)
-        best_audio = audio_formats[0]
-        
-        stream_url = best_audio.get("url")
-        if not stream_url:
-            print("No direct stream URL (signature required)")
-            return None
-        
-        return {
-            "stream_url": stream_url,
-            "title": video_details.get("title", "Unknown Title"),
-            "artist": video_details.get("author", "Unknown Artist"),
-            "thumbnail": f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg",
-            "duration": int(video_details.get("lengthSeconds", 0)),
-            "mime_type": best_audio.get("mimeType", "audio/mp4"),
-        }
-    except Exception as e:
-        print(f"InnerTube stream error: {e}")
+        for key in _SEARCH_PATH:
+            contents = contents[key]
+    except (KeyError, TypeError):
+        return
+
+    for section in contents:
+        renderer = section.get("itemSectionRenderer")
+        if not renderer:
+            continue
+
+        for item in renderer.get("contents", ()):
+            video = item.get("videoRenderer")
+            if not video:
+                continue
+            try:
+                yield _parse_video_renderer(video)
+            except (KeyError, IndexError, ValueError):
+                continue
+
+
+@lru_cache(maxsize=4096)
+def _parse_duration(length_text: str) -> int:
+    """Seconds in a "M:SS" / "H:MM:SS" length (0 if empty)."""
+    if not length_text:
+        return 0
+    return sum(int(part) * mult for part, mult in zip(reversed(length_text.split(":")), (1, 60, 3600)))
+
+
+def _parse_video_renderer(video: dict) -> dict:
+    """Build a track dict from a search result's videoRenderer."""
+    video_id = video["videoId"]
+    title = video["title"]["runs"][0]["text"]
+    try:
+        channel = video["ownerText"]["runs"][0]["text"]
+    except (KeyError, IndexError):
+        channel = "Unknown Artist"
+
+    # Get best thumbnail
+    try:
+        thumbnail = video["thumbnail"]["thumbnails"][-1]["url"]
+    except (KeyError, IndexError):
+        thumbnail = f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
+
+    length = video.get("lengthText")
+    duration = _parse_duration(length["simpleText"]) if length and "simpleText" in length else 0
+
+    return {
+        "video_id": video_id,
+        "title": title,
+        "artist": channel,
+        "thumbnail": thumbnail,
+        "duration": duration,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+    }
+
+
+async def get_stream_url_async(video_id: str) -> Optional[dict]:
+    """Get an audio stream URL from the InnerTube mobile (ANDROID/IOS) clients.
+
+    Safe to fan out with asyncio.gather.
+    """
+    cached = _stream_cache.get(video_id)
+    if cached is not None:
+        return cached
+    for name, template in _player_order():
+        try:
+            player = await _innertube_call(template, "player", {"videoId": video_id})
+        except Exception as e:
+            log.warning("InnerTube %s stream error: %s", name, e)
+            _record_player_result(name, False)
+            continue
+        _record_player_result(name, True)
+        stream_info = _parse_player(player, video_id)
+        if stream_info is not None:
+            return _cache_stream(video_id, stream_info)
+    return None
+
+
+def _cache_stream(video_id: str, stream_info: Optional[dict]) -> Optional[dict]:
+    if stream_info is not None:
+        _stream_cache.set(video_id, stream_info)
+    return stream_info
+
+
+def invalidate(video_id: str) -> None:
+    """Drop a cached stream URL, e.g. after YouTube rejected it (403)."""
+    _stream_cache.pop(video_id)
+
+
+def _parse_player(player: dict, video_id: str) -> Optional[dict]:
+    """Pick the best audio stream out of an InnerTube player response."""
+    # Check playability
+    playability = player.get("playabilityStatus", {})
+    if playability.get("status") != "OK":
+        reason = playability.get("reason", "Unknown error")
+        log.info("InnerTube playability error for %s: %s", video_id, reason)
         return None
+    
+    # Get video details
+    video_details = player.get("videoDetails", {})
+    
+    # Get streaming data
+    streaming = player.get("streamingData", {})
+    formats = streaming.get("adaptiveFormats", [])
+    
+    # Find best audio format (highest bitrate)
+    best_audio = max(
+        (f for f in formats if f.get("mimeType", "").startswith("audio/")),
+        key=lambda f: f.get("bitrate", 0),
+        default=None,
+    )
+    if best_audio is None:
+        log.info("No audio formats found for %s", video_id)
+        return None
+    
+    stream_url = best_audio.get("url")
+    if not stream_url:
+        log.info("No direct stream URL for %s (signature required)", video_id)
+        return None
+    
+    # Largest thumbnail the player lists; maxresdefault does not exist for
+    # every video
+    try:
+        thumbnail = video_details["thumbnail"]["thumbnails"][-1]["url"]
+    except (KeyError, IndexError):
+        thumbnail = f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
+
+    return {
+        "stream_url": stream_url,
+        "title": video_details.get("title", "Unknown Title"),
+        "artist": video_details.get("author", "Unknown Artist"),
+        "thumbnail": thumbnail,
+        "duration": int(video_details.get("lengthSeconds", 0)),
+        "mime_type": best_audio.get("mimeType", "audio/mp4"),
+    }
+
+
+_cookies_lock = threading.Lock()
 
 
 def _get_cookies_path() -> Optional[str]:
-    """Get YouTube cookies for yt-dlp fallback."""
+    """Get YouTube cookies for yt-dlp fallback, resolved once per process."""
+    # Lock so concurrent downloads don't both write the cookies file
+    with _cookies_lock:
+        return _load_cookies_path()
+
+
+@lru_cache(maxsize=1)
+def _load_cookies_path() -> Optional[str]:
     cookies_path = os.getenv("YOUTUBE_COOKIES_PATH")
     if cookies_path and os.path.exists(cookies_path):
         return cookies_path
@@ -141,27 +340,67 @@ def _get_cookies_path() -> Optional[str]:
                 f.write(cookies_content)
             return temp_cookies
         except Exception as e:
-            print(f"Error processing cookies: {e}")
+            log.error("Error processing cookies: %s", e)
             return None
     return None
 
 
-def download_audio_ytdlp(video_id: str) -> tuple[str, dict]:
-    """Download using yt-dlp (fallback method)."""
-    temp_dir = tempfile.mkdtemp()
-    output_template = os.path.join(temp_dir, "%(id)s.%(ext)s")
+# Downloads go to uniquely named files in one long-lived directory per
+# worker process instead of a fresh temp dir each
+_SCRATCH_DIR = os.path.join(tempfile.gettempdir(), f"yt_scratch_{os.getpid()}")
+os.makedirs(_SCRATCH_DIR, exist_ok=True)
+# Removed on exit, with anything a failed download left behind
+atexit.register(shutil.rmtree, _SCRATCH_DIR, ignore_errors=True)
+
+
+def _scratch_name() -> str:
+    return os.path.join(_SCRATCH_DIR, uuid.uuid4().hex)
+
+
+# The InnerTube download reads from the network; give up on it after this
+FFMPEG_DOWNLOAD_TIMEOUT = 300
+
+# Encodes are CPU-bound, so at most one ffmpeg per core runs at once; further
+# tracks wait here while their stream lookups and uploads proceed
+FFMPEG_CONCURRENCY = int(os.getenv("FFMPEG_CONCURRENCY", os.cpu_count() or 1))
+_ffmpeg_slots = asyncio.Semaphore(FFMPEG_CONCURRENCY)
+
+# Spotify-like mastering chain shared by the fused download and normalize_audio
+_PRE_LOUDNORM_FILTERS = (
+    "highpass=f=40,"
+    "equalizer=f=60:width_type=o:width=2:g=2,"
+    "equalizer=f=14000:width_type=o:width=2:g=1,"
+    "compand=attacks=0:points=-80/-80|-15/-15|-0/-0.5|20/-0.1:gain=1,"
+)
+LOUDNORM_TARGET = "I=-14:TP=-1.0:LRA=11"
+AUDIO_FILTERS = f"{_PRE_LOUDNORM_FILTERS}loudnorm={LOUDNORM_TARGET}"
+
+# loudnorm first-pass measurements, keyed by a hash of the input's size and
+# first MiB, so re-mastering the same audio skips the measuring pass
+_loudness_cache = TTLCache(maxsize=1024, ttl=24 * 3600)
+
+
+def download_audio_ytdlp(video_id: str, extract_mp3: bool = True) -> tuple[str, dict]:
+    """Download using yt-dlp (fallback method).
+
+    With extract_mp3=False the downloaded audio is returned as is (usually
+    webm/m4a), for callers that transcode it themselves.
+    """
+    base_path = _scratch_name()
+    output_template = f"{base_path}.%(ext)s"
 
     ydl_opts = {
         "format": "bestaudio/best",
         "outtmpl": output_template,
         "quiet": True,
         "no_warnings": True,
-        "postprocessors": [{
+    }
+    if extract_mp3:
+        ydl_opts["postprocessors"] = [{
             "key": "FFmpegExtractAudio",
             "preferredcodec": "mp3",
             "preferredquality": "320",
-        }],
-    }
+        }]
 
     cookies_path = _get_cookies_path()
     if cookies_path:
@@ -169,15 +408,16 @@ def download_audio_ytdlp(video_id: str) -> tuple[str, dict]:
 
     url = f"https://www.youtube.com/watch?v={video_id}"
 
+    # Imported on first use: yt-dlp is large and most downloads never need it
+    import yt_dlp
+
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(url, download=True)
 
-    audio_path = os.path.join(temp_dir, f"{video_id}.mp3")
-    if not os.path.exists(audio_path):
-        for file in os.listdir(temp_dir):
-            if file.endswith(".mp3"):
-                audio_path = os.path.join(temp_dir, file)
-                break
+    if extract_mp3:
+        audio_path = f"{base_path}.mp3"
+    else:
+        audio_path = info["requested_downloads"][0]["filepath"]
 
     metadata = {
         "title": info.get("title", "Unknown Title"),
@@ -189,90 +429,208 @@ def download_audio_ytdlp(video_id: str) -> tuple[str, dict]:
     return audio_path, metadata
 
 
-def download_audio(video_id: str) -> tuple[str, dict]:
+async def _run_ffmpeg(cmd: list, timeout: Optional[float] = None) -> bytes:
+    """Run ffmpeg without blocking the event loop and return its stderr.
+
+    Waits for a free slot first (see FFMPEG_CONCURRENCY); `timeout` counts
+    from when ffmpeg starts.
+
+    Raises RuntimeError with ffmpeg's error output if it fails, or after
+    killing it once `timeout` seconds have passed.
+    """
+    async with _ffmpeg_slots:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            proc.kill()
+            await proc.wait()
+            raise
+    if proc.returncode:
+        message = stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(message or f"ffmpeg exited with status {proc.returncode}")
+    return stderr
+
+
+async def download_audio(video_id: str, audio_filters: Optional[str] = None) -> tuple[str, dict]:
     """
     Download audio with fallback chain:
-    1. InnerTube ANDROID (stream + ffmpeg)
+    1. InnerTube ANDROID/IOS (stream + ffmpeg)
     2. yt-dlp with cookies (download)
+
+    `audio_filters` are applied while transcoding to MP3 (from either
+    source); metadata["mastered"] tells whether that happened.
     """
     # Try InnerTube first
-    print(f"[InnerTube] Attempting to fetch stream for {video_id}...")
-    stream_info = get_stream_url_innertube(video_id)
+    log.debug("[InnerTube] Attempting to fetch stream for %s", video_id)
+    stream_info = await get_stream_url_async(video_id)
     
     if stream_info and stream_info.get("stream_url"):
-        print(f"[InnerTube] ✓ Got stream URL, downloading with FFmpeg...")
+        log.debug("[InnerTube] Got stream URL for %s, downloading with FFmpeg", video_id)
+        output_path = f"{_scratch_name()}.mp3"
         try:
-            temp_dir = tempfile.mkdtemp()
-            output_path = os.path.join(temp_dir, f"{video_id}.mp3")
-
-            cmd = [
-                "ffmpeg",
-                "-i", stream_info["stream_url"],
-                "-vn",
-                "-acodec", "libmp3lame",
-                "-ab", "320k",
-                "-ar", "48000",
-                "-y",
-                output_path,
-            ]
-
-            subprocess.run(cmd, check=True, capture_output=True, timeout=300)
+            await _encode_mp3(
+                stream_info["stream_url"], output_path, audio_filters, FFMPEG_DOWNLOAD_TIMEOUT
+            )
 
             metadata = {
                 "title": stream_info["title"],
                 "artist": stream_info["artist"],
                 "thumbnail": stream_info["thumbnail"],
                 "duration": stream_info["duration"],
+                "mastered": bool(audio_filters),
             }
 
-            print(f"[InnerTube] ✓ Download complete")
+            log.debug("[InnerTube] Download complete for %s", video_id)
             return output_path, metadata
         except Exception as e:
-            print(f"[InnerTube] ✗ FFmpeg failed: {e}")
+            log.warning("[InnerTube] FFmpeg failed for %s: %r", video_id, e)
+            cleanup_temp_files(output_path)
+            # Most often an expired/rejected URL; fetch a fresh one next time
+            invalidate(video_id)
             # Fall through to yt-dlp
     
-    # Fallback to yt-dlp
-    print(f"[yt-dlp] Falling back to yt-dlp...")
-    return download_audio_ytdlp(video_id)
+    # Fallback to yt-dlp (blocking library, so it runs in a worker thread)
+    log.info("[yt-dlp] Falling back to yt-dlp for %s", video_id)
+    if not audio_filters:
+        return await asyncio.to_thread(download_audio_ytdlp, video_id)
+
+    # Master yt-dlp's native download in one encode, rather than having it
+    # transcode to MP3 first and then re-encoding that
+    source_path, metadata = await asyncio.to_thread(download_audio_ytdlp, video_id, False)
+    output_path = f"{os.path.splitext(source_path)[0]}_mastered.mp3"
+    if audio_filters == AUDIO_FILTERS:
+        # A local file can get the two-pass loudnorm, when enabled
+        audio_filters = await _mastering_filters(source_path)
+    try:
+        await _encode_mp3(source_path, output_path, audio_filters)
+    except (OSError, RuntimeError) as e:
+        log.warning("[yt-dlp] Mastering failed for %s: %s", video_id, e)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return source_path, metadata
+    os.remove(source_path)
+    metadata["mastered"] = True
+    return output_path, metadata
+
+
+async def _encode_mp3(
+    source: str, output_path: str, audio_filters: Optional[str], timeout: Optional[float] = None
+) -> None:
+    """Transcode a file or stream URL to 320 kbps MP3, optionally filtered."""
+    # -loglevel error keeps the captured stderr to the actual errors
+    cmd = ["ffmpeg", "-loglevel", "error", "-i", source, "-vn"]
+    if audio_filters:
+        cmd += ["-af", audio_filters]
+    cmd += [
+        "-acodec", "libmp3lame",
+        "-ab", "320k",
+        "-ar", "48000",
+        "-ac", "2",
+        "-y",
+        output_path,
+    ]
+    await _run_ffmpeg(cmd, timeout=timeout)
 
 
-def normalize_audio(input_path: str) -> str:
-    """Apply Spotify-like audio mastering."""
-    output_path = input_path.replace(".mp3", "_normalized.mp3")
-    
-    audio_filters = (
-        "highpass=f=40,"
-        "equalizer=f=60:width_type=o:width=2:g=2,"
-        "equalizer=f=14000:width_type=o:width=2:g=1,"
-        "compand=attacks=0:points=-80/-80|-15/-15|-0/-0.5|20/-0.1:gain=1,"
-        "loudnorm=I=-14:TP=-1.0:LRA=11"
+async def download_and_master(video_id: str) -> tuple[str, dict]:
+    """Download and master a track.
+
+    The audio is decoded, filtered and encoded in a single ffmpeg pass; the
+    separate normalize_audio pass only runs if that failed on a yt-dlp file.
+    """
+    audio_path, metadata = await download_audio(video_id, AUDIO_FILTERS)
+    if metadata.get("mastered"):
+        return audio_path, metadata
+    return await normalize_audio(audio_path), metadata
+
+
+def _content_key(path: str) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(os.path.getsize(path)).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(1024 * 1024))
+    return digest.digest()
+
+
+async def _measure_loudness(input_path: str) -> dict:
+    """Run loudnorm's measuring pass (after the rest of the chain)."""
+    # Stat + 1 MiB read: keep the file I/O off the event loop
+    key = await asyncio.to_thread(_content_key, input_path)
+    cached = _loudness_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cmd = [
+        "ffmpeg",
+        "-hide_banner", "-nostats",
+        "-i", input_path,
+        "-af", f"{_PRE_LOUDNORM_FILTERS}loudnorm={LOUDNORM_TARGET}:print_format=json",
+        "-f", "null", "-",
+    ]
+    output = (await _run_ffmpeg(cmd)).decode("utf-8", "replace")
+    # The stats are the last (flat) JSON object ffmpeg prints
+    stats = json.loads(output[output.rindex("{"):output.rindex("}") + 1])
+    _loudness_cache.set(key, stats)
+    return stats
+
+
+async def _mastering_filters(input_path: str) -> str:
+    """The filter chain for a file: two-pass loudnorm when enabled and measurable."""
+    if not LOUDNORM_TWO_PASS:
+        return AUDIO_FILTERS
+    try:
+        stats = await _measure_loudness(input_path)
+        measured = {
+            name: float(stats[name])
+            for name in ("input_i", "input_lra", "input_tp", "input_thresh", "target_offset")
+        }
+    except (OSError, RuntimeError, ValueError, KeyError) as e:
+        log.warning("Loudness measurement failed, using single-pass loudnorm: %s", e)
+        return AUDIO_FILTERS
+    # Silent input measures as -inf, which loudnorm rejects
+    if not all(math.isfinite(value) for value in measured.values()):
+        return AUDIO_FILTERS
+    return (
+        f"{_PRE_LOUDNORM_FILTERS}loudnorm={LOUDNORM_TARGET}"
+        f":measured_I={measured['input_i']}"
+        f":measured_LRA={measured['input_lra']}"
+        f":measured_TP={measured['input_tp']}"
+        f":measured_thresh={measured['input_thresh']}"
+        f":offset={measured['target_offset']}"
+        ":linear=true"
     )
 
+
+async def normalize_audio(input_path: str) -> str:
+    """Apply Spotify-like audio mastering."""
+    output_path = f"{os.path.splitext(input_path)[0]}_normalized.mp3"
+
     cmd = [
         "ffmpeg",
+        "-loglevel", "error",
         "-i", input_path,
-        "-af", audio_filters,
+        "-af", await _mastering_filters(input_path),
         "-ar", "48000",
+        "-ac", "2",
         "-b:a", "320k",
         "-y",
         output_path,
     ]
 
     try:
-        subprocess.run(cmd, check=True, capture_output=True)
+        await _run_ffmpeg(cmd)
         os.remove(input_path)
         return output_path
-    except subprocess.CalledProcessError:
+    except RuntimeError:
         return input_path
 
 
 def cleanup_temp_files(file_path: str) -> None:
     """Clean up temporary files."""
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        temp_dir = os.path.dirname(file_path)
-        if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-            os.rmdir(temp_dir)
-    except Exception:
+        os.remove(file_path)
+    except OSError:
         pass